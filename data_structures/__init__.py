@@ -8,4 +8,6 @@ from .priority_queue import PriorityQueue
 from .hashtable import HashTable
 from .graph import Graph
 from .trie import Trie
-from .bst import BinaryTree, display
\ No newline at end of file
+from .bst import BinaryTree, display
+from .array_bst import ArrayBinaryTree
+from .concurrent_bst import ConcurrentBinaryTree
\ No newline at end of file
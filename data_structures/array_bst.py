@@ -0,0 +1,333 @@
+"""AVL Binary Search Tree stored in parallel arrays."""
+
+from array import array
+from collections import deque
+
+
+NIL = 0
+
+
+class ArrayBinaryTree(object):
+    """
+    AVL Binary search tree with nodes stored as indices into columns.
+
+    Instead of one object per node, node i is made of keys[i], left[i],
+    right[i], parent[i] and height[i]. Index 0 is the empty node, so
+    height[0] is 0 and a child index of 0 means no child. Slots freed by
+    delete are chained through the left column and reused by insert.
+
+    Pass an array typecode (e.g. 'q' or 'd') to store numeric keys in an
+    array rather than a list of Python objects.
+    """
+
+    def __init__(self, iterable=None, typecode=None):
+        """Initialize columns with the empty node."""
+        self.typecode = typecode
+        self.keys = array(typecode, [0]) if typecode else [None]
+        self.left = array('i', [NIL])
+        self.right = array('i', [NIL])
+        self.parent = array('i', [NIL])
+        self.height = array('b', [0])
+        self.root = NIL
+        self.rotations = 0
+        self._size = 0
+        self._free = NIL
+        self._columns = {
+            'val': self.keys,
+            'left': self.left,
+            'right': self.right,
+            'parent': self.parent,
+            'depth': self.height,
+        }
+        if iterable:
+            for val in iterable:
+                self.insert(val)
+
+    def insert(self, val):
+        """Insert val into the tree, ignore it if already present."""
+        keys, left, right = self.keys, self.left, self.right
+        if not self.root:
+            self.root = self._new_node(val, NIL)
+            self._size += 1
+            return
+        cur = self.root
+        while True:
+            key = keys[cur]
+            if val == key:
+                return
+            if val < key:
+                if not left[cur]:
+                    left[cur] = self._new_node(val, cur)
+                    break
+                cur = left[cur]
+            else:
+                if not right[cur]:
+                    right[cur] = self._new_node(val, cur)
+                    break
+                cur = right[cur]
+        self._size += 1
+        self._retrace(cur)
+
+    def search(self, val):
+        """Return index of node with value val if it exists, otherwise None."""
+        keys, left, right = self.keys, self.left, self.right
+        cur = self.root
+        while cur:
+            key = keys[cur]
+            if val == key:
+                return cur
+            cur = left[cur] if val < key else right[cur]
+
+    def contains(self, val):
+        """Return whether val in tree."""
+        return self.search(val) is not None
+
+    def delete(self, val, error=False):
+        """Delete val from the tree and rebalance as needed."""
+        to_d = self.search(val)
+        if to_d is None:
+            if error:
+                raise ValueError('Not in tree.')
+            return
+        left, right, parent = self.left, self.right, self.parent
+        if left[to_d] and right[to_d]:
+            successor = right[to_d]
+            while left[successor]:
+                successor = left[successor]
+            self.keys[to_d] = self.keys[successor]
+            to_d = successor
+        child = left[to_d] or right[to_d]
+        above = parent[to_d]
+        if child:
+            parent[child] = above
+        if not above:
+            self.root = child
+        elif left[above] == to_d:
+            left[above] = child
+        else:
+            right[above] = child
+        self._free_node(to_d)
+        self._size -= 1
+        if above:
+            self._retrace(above)
+
+    def balance(self, from_='root'):
+        """Return left vs right balance from a node on the tree."""
+        if from_ == 'root':
+            from_ = self.root
+        return self.height[self.left[from_]] - self.height[self.right[from_]]
+
+    def pre_order(self, start='root', attr='val'):
+        """Return a generator of pre-order traversal."""
+        column = self._column(attr)
+        left, right = self.left, self.right
+        stack = [self.root if start == 'root' else start]
+        while stack:
+            node = stack.pop()
+            if node:
+                yield column[node] if column else node
+                stack.append(right[node])
+                stack.append(left[node])
+
+    def post_order(self, start='root', attr='val'):
+        """Return a generator of post-order traversal."""
+        column = self._column(attr)
+        left, right = self.left, self.right
+        node = self.root if start == 'root' else start
+        stack, last = [], NIL
+        while stack or node:
+            if node:
+                stack.append(node)
+                node = left[node]
+                continue
+            peek = stack[-1]
+            if right[peek] and right[peek] != last:
+                node = right[peek]
+            else:
+                last = stack.pop()
+                yield column[last] if column else last
+
+    def in_order(self, start='root', attr='val'):
+        """Return a generator of tree's nodes in order."""
+        column = self._column(attr)
+        left, right = self.left, self.right
+        node = self.root if start == 'root' else start
+        stack = []
+        while stack or node:
+            if node:
+                stack.append(node)
+                node = left[node]
+            else:
+                node = stack.pop()
+                yield column[node] if column else node
+                node = right[node]
+
+    def breadth_first(self, start='root', attr='val'):
+        """Return generator of breadth first traversal of tree."""
+        column = self._column(attr)
+        left, right = self.left, self.right
+        queue = deque([self.root if start == 'root' else start])
+        while queue:
+            node = queue.popleft()
+            if node:
+                yield column[node] if column else node
+                queue.append(left[node])
+                queue.append(right[node])
+
+    def _column(self, attr):
+        """Return column holding attr, None to yield node indices."""
+        if attr is None:
+            return None
+        try:
+            return self._columns[attr]
+        except KeyError:
+            raise AttributeError('Nodes have no attribute ' + repr(attr))
+
+    def _new_node(self, val, parent):
+        """Store val in a free slot, or a new one, and return its index."""
+        node = self._free
+        if node:
+            self._free = self.left[node]
+            self.keys[node] = val
+            self.left[node] = NIL
+            self.parent[node] = parent
+            self.height[node] = 1
+        else:
+            node = len(self.keys)
+            self.keys.append(val)
+            self.left.append(NIL)
+            self.right.append(NIL)
+            self.parent.append(parent)
+            self.height.append(1)
+        return node
+
+    def _free_node(self, node):
+        """Clear slot and push it onto the free list."""
+        self.keys[node] = self.keys[NIL]
+        self.left[node] = self._free
+        self.right[node] = NIL
+        self.parent[node] = NIL
+        self.height[node] = 0
+        self._free = node
+
+    def _retrace(self, node):
+        """
+        Fix heights and balance from node up to the root.
+
+        Stops as soon as a subtree's height is unchanged, since nothing
+        above it can have changed either.
+        """
+        height = self.height
+        while node:
+            old_height = height[node]
+            node = self._fix(node)
+            if height[node] == old_height:
+                return
+            node = self.parent[node]
+
+    def _fix(self, node):
+        """Update node's height, rotate if unbalanced, return subtree root."""
+        left, right, height = self.left, self.right, self.height
+        balance = height[left[node]] - height[right[node]]
+        if balance > 1:
+            self.rotations += 1
+            child = left[node]
+            if height[left[child]] < height[right[child]]:
+                self._rotate_left(child)
+            return self._rotate_right(node)
+        if balance < -1:
+            self.rotations += 1
+            child = right[node]
+            if height[right[child]] < height[left[child]]:
+                self._rotate_right(child)
+            return self._rotate_left(node)
+        self._update_height(node)
+        return node
+
+    def _rotate_left(self, node):
+        """Rotate left around node, return the new subtree root."""
+        left, right, parent = self.left, self.right, self.parent
+        new_root = right[node]
+        inner = left[new_root]
+        right[node] = inner
+        if inner:
+            parent[inner] = node
+        self._replace_child(node, new_root)
+        left[new_root] = node
+        parent[node] = new_root
+        self._update_height(node)
+        self._update_height(new_root)
+        return new_root
+
+    def _rotate_right(self, node):
+        """Rotate right around node, return the new subtree root."""
+        left, right, parent = self.left, self.right, self.parent
+        new_root = left[node]
+        inner = right[new_root]
+        left[node] = inner
+        if inner:
+            parent[inner] = node
+        self._replace_child(node, new_root)
+        right[new_root] = node
+        parent[node] = new_root
+        self._update_height(node)
+        self._update_height(new_root)
+        return new_root
+
+    def _replace_child(self, old, new):
+        """Point old's parent (or the root) at new instead of old."""
+        above = self.parent[old]
+        self.parent[new] = above
+        if not above:
+            self.root = new
+        elif self.left[above] == old:
+            self.left[above] = new
+        else:
+            self.right[above] = new
+
+    def _update_height(self, node):
+        """Recompute height of node from its children."""
+        height = self.height
+        height[node] = 1 + max(height[self.left[node]],
+                               height[self.right[node]])
+
+    def __len__(self):
+        """Return number of nodes in tree."""
+        return self._size
+
+    def __iter__(self):
+        """Iterate over values in order."""
+        return self.in_order()
+
+    def __contains__(self, val):
+        """Return whether val in tree."""
+        return self.contains(val)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import random
+    import sys
+    import tracemalloc
+
+    from data_structures.bst import BinaryTree
+
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5
+    vals = random.sample(range(num * 10), num)
+
+    def measure(build):
+        tracemalloc.start()
+        tree = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return tree, size
+
+    results = [
+        ('BinaryTree', measure(lambda: BinaryTree(vals))[1]),
+        ('ArrayBinaryTree', measure(lambda: ArrayBinaryTree(vals))[1]),
+        ("ArrayBinaryTree('q')",
+         measure(lambda: ArrayBinaryTree(vals, typecode='q'))[1]),
+    ]
+    print('\nMemory for {} integer keys:'.format(num))
+    for name, size in results:
+        print('\t{:<22}{:>8.1f} MB  {:>6.1f} bytes/key'.format(
+            name, size / 2 ** 20, size / num))
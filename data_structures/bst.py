@@ -1,66 +1,378 @@
 """AVL Binary Search Tree module."""
 
 import math
+import operator
+import pickle
 import shutil
+import struct
+import sys
+from collections import namedtuple
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+OpStats = namedtuple('OpStats', 'op val comparisons rotations retraced')
+
+# magic, version, key typecode (0 for pickled keys), flags, node count
+DUMP_HEADER = struct.Struct('<4sBcBxQ')
+DUMP_MAGIC = b'AVLT'
+DUMP_VALUES = 1
+DUMP_BIG_ENDIAN = 2
+
+AGGREGATES = {
+    'sum': operator.add,
+    'min': min,
+    'max': max,
+}
+
+_MISSING = object()
 
 
 class BinaryTree(object):
     """
     AVL Binary search tree.
+
+    update() and delete_many() rebuild the whole tree once a batch holds
+    at least 1/bulk_ratio as many values as the tree.
+
+    Set stats_hook to a function to have it called with an OpStats after
+    every insert and delete: the number of nodes compared against, the
+    rotations done and the nodes whose depths were recomputed.
+
+    aggregate is an associative function of two arguments (or one of
+    'sum', 'min', 'max', 'count'). Each node then caches in node.agg the
+    aggregate of measure(node) over its subtree, measure defaulting to
+    the node's val, and aggregate(lo, hi) takes O(log n).
+
+    With persistent=True, insert and delete copy the nodes they change
+    instead of modifying them, so snapshot() can hand out read-only
+    versions of the tree in O(1) that share all unchanged nodes. Nodes of
+    persistent trees don't keep parent pointers.
+
+    balancer='scapegoat' replaces rotations with occasional rebuilds:
+    inserts and deletes only fix depths and sizes, an insert landing too
+    deep rebuilds the subtree of the lowest ancestor heavier than
+    scapegoat_alpha on one side, and once deletes shrink the tree below
+    scapegoat_alpha of its largest size since the last full rebuild, the
+    whole tree is rebuilt.
+
+    With finger=True the tree remembers the node last searched, inserted
+    or deleted next to, and the next search or insert climbs from there
+    through parent pointers only as far as the subtree that must hold its
+    value before walking down: O(log d) for values d positions away.
     """
 
-    def __init__(self, iterable=None, autobalance=True):
+    bulk_ratio = 20
+    scapegoat_alpha = 0.7
+    stats_hook = None
+    _dump_values = False
+
+    def __init__(self, iterable=None, autobalance=True, persistent=False,
+                 aggregate=None, measure=None, balancer='avl', finger=False):
         """Initialize bst with root and size."""
+        if balancer not in ('avl', 'scapegoat'):
+            raise ValueError('Unknown balancer: {!r}'.format(balancer))
+        if persistent and balancer != 'avl':
+            raise ValueError('Persistent trees can only use the avl balancer.')
+        if persistent and finger:
+            raise ValueError('Persistent trees have no parent pointers to '
+                             'search from a finger.')
         self.root = None
         self._size = 0
         self.autobalance = autobalance
+        self.balancer = balancer
+        self.finger = finger
+        self._finger = None
         self.rotations = 0
+        self.rebuilds = 0
+        self.persistent = persistent
+        self.read_only = False
+        self._gen = object() if persistent else None
+        self._retraced = 0
+        self._compared = 0
+        self._max_size = 0
+        self.agg_spec = self._agg_spec(aggregate, measure)
         if iterable:
             if isinstance(iterable, range):
-                iterable = treegen(iterable)
+                self._relink(sorted(iterable))
+                return
             try:
                 for val in iterable:
                     self.insert(val)
             except:
                 raise Exception
 
+    @classmethod
+    def from_sorted(cls, iterable, presorted=True, **kwargs):
+        """
+        Build a perfectly balanced tree from iterable in O(n).
+
+        Nodes are linked directly with correct depths, no inserts or
+        rotations happen. With presorted=True the iterable must already be
+        in ascending order; otherwise it is sorted first. Duplicates are
+        dropped either way. Other keyword arguments go to the constructor.
+        """
+        tree = cls(**kwargs)
+        tree._relink(iterable if presorted else sorted(iterable))
+        return tree
+
+    def _relink(self, sorted_vals):
+        """Replace contents of tree with a balanced tree of sorted_vals."""
+        self._relink_nodes(
+            [self._new_node(val) for val in unique_sorted(sorted_vals)])
+
+    def _agg_spec(self, aggregate, measure):
+        """Return (function, measure) pair nodes aggregate with, or None."""
+        if aggregate is None:
+            return None
+        if aggregate == 'count':
+            return operator.add, lambda node: 1
+        return (AGGREGATES.get(aggregate, aggregate),
+                measure or operator.attrgetter('val'))
+
+    def _new_node(self, val, parent=None, value=_MISSING):
+        """Return a new node for val set up for this tree."""
+        node = BinaryTreeNode(val, parent=parent)
+        if self.persistent:
+            node.gen = self._gen
+        if value is not _MISSING:
+            node.value = value
+        if self.agg_spec:
+            node.agg_spec = self.agg_spec
+            node.refresh_agg()
+        return node
+
+    def _set_root(self, root):
+        """Make root (a detached subtree) the contents of the tree."""
+        if root:
+            root.parent = None
+        self.root = root
+        self._size = self._max_size = root.size if root else 0
+        self._finger = None
+
+    def _empty_like(self, **kwargs):
+        """Return an empty tree with the same settings as this one."""
+        if self.agg_spec:
+            kwargs['aggregate'], kwargs['measure'] = self.agg_spec
+        return type(self)(autobalance=self.autobalance,
+                          balancer=self.balancer, finger=self.finger, **kwargs)
+
+    def _take_root(self):
+        """Empty tree and return its old root."""
+        if self.persistent:
+            raise TypeError('Persistent trees only support insert and delete.')
+        root = self.root
+        self.root = None
+        self._size = 0
+        self._finger = None
+        return root
+
+    @classmethod
+    def join(cls, left, val, right):
+        """
+        Return a new tree holding left's values, val and right's values.
+
+        Every value in left must be less than val, which must be less than
+        every value in right. Takes O(|h(left) - h(right)|) time; the nodes
+        of left and right are reused, leaving both trees empty.
+        """
+        return left._join(val, _MISSING, right)
+
+    def _join(self, val, value, right):
+        """Return a new tree of this tree, a node for val and right."""
+        if self.root and not self.node_furthest('right').val < val:
+            raise ValueError('Values in left tree must be less than val.')
+        if right.root and not val < right.node_furthest('left').val:
+            raise ValueError('Values in right tree must be greater than val.')
+        tree = self._empty_like()
+        tree._set_root(join_nodes(
+            self._take_root(), tree._new_node(val, value=value),
+            right._take_root()))
+        return tree
+
+    def split(self, val):
+        """
+        Split tree around val in O(log n).
+
+        Return (left, found, right): a tree of the values less than val,
+        whether val was in the tree, and a tree of the values greater than
+        val. The nodes are reused, leaving this tree empty.
+        """
+        left, mid, right = split_nodes(self._take_root(), val)
+        left_tree = self._empty_like()
+        right_tree = self._empty_like()
+        left_tree._set_root(left)
+        right_tree._set_root(right)
+        return left_tree, mid is not None, right_tree
+
+    def union(self, other):
+        """
+        Add all values of other to this tree.
+
+        Takes O(m log(n/m + 1)) for trees of sizes m <= n. The nodes of
+        other are moved into this tree, leaving other empty.
+        """
+        if other is not self:
+            self._set_root(union_nodes(self._take_root(), other._take_root()))
+
+    def intersection(self, other):
+        """Keep only values also in other. Leaves other empty."""
+        if other is not self:
+            self._set_root(
+                intersection_nodes(self._take_root(), other._take_root()))
+
+    def difference(self, other):
+        """Remove all values that are in other. Leaves other empty."""
+        if other is self:
+            self._take_root()
+        else:
+            self._set_root(
+                difference_nodes(self._take_root(), other._take_root()))
+
+    def snapshot(self):
+        """
+        Return a read-only version of the tree's current state in O(1).
+
+        The snapshot shares nodes with the tree; later inserts and deletes
+        copy any shared node before changing it, so the snapshot never sees
+        them. Requires persistent=True.
+        """
+        if not self.persistent:
+            raise TypeError('snapshot() requires a persistent tree.')
+        snap = self._empty_like(persistent=True)
+        snap.root = self.root
+        snap._size = self._size
+        snap.read_only = True
+        self._gen = object()
+        return snap
+
     def insert(self, val):
         """Insert a new node into the bst."""
+        if self.stats_hook:
+            return self._with_stats('insert', val, self.insert, val)
+        if self.persistent:
+            self._check_writable()
+            if not self.contains(val):
+                self.root = self._persistent_insert(self.root, val)
+                self._size += 1
+        else:
+            self._insert_node(val)
+
+    def _insert_node(self, val, value=_MISSING):
+        """
+        Insert val if not already in tree, return node holding val.
+
+        If given, value is stored on the node before any aggregates are
+        updated.
+        """
         cur = self.root
         if cur is None:
-            self.root = BinaryTreeNode(val)
+            self.root = self._new_node(val, value=value)
             self._size += 1
-        else:
-            while True:
-                if val == cur.val:
-                    return
-                child, left_or_right = cur.left_or_right(val)
-                if child is None:
-                    self._size += 1
-                    new_node = BinaryTreeNode(val, parent=cur)
-                    setattr(cur, left_or_right, new_node)
-                    self._bubble_up_depth_from(cur)
-                    if self.autobalance:
-                        r_root = self._find_unbalanced(new_node)
-                        if r_root:
-                            self._rebalance(r_root)
-                    break
-                else:
-                    cur = child
+            return self.root
+        if self.finger:
+            cur = self._finger_start(val)
+        compared = 0
+        while True:
+            compared += 1
+            if val == cur.val:
+                self._compared += compared
+                if value is not _MISSING:
+                    self._set_value(cur, value)
+                if self.finger:
+                    self._finger = cur
+                return cur
+            child, left_or_right = cur.left_or_right(val)
+            if child is None:
+                self._compared += compared
+                self._size += 1
+                new_node = self._new_node(val, parent=cur, value=value)
+                setattr(cur, left_or_right, new_node)
+                self._retrace(cur, 1)
+                if self.balancer == 'scapegoat' and self.autobalance:
+                    self._rebuild_if_deep(new_node)
+                if self.finger:
+                    self._finger = new_node
+                return new_node
+            else:
+                cur = child
 
     def search(self, val):
         """Return node with value val if it exists, otherwise None."""
+        if self.finger:
+            return self._finger_search(val)
         cur_node = self.root
+        compared = 0
         while cur_node:
+            compared += 1
             if cur_node.val == val:
-                return cur_node
+                break
             cur_node, trash = cur_node.left_or_right(val)
+        self._compared += compared
+        return cur_node
+
+    def _finger_start(self, val):
+        """
+        Return lowest node above the finger whose subtree spans val.
+
+        Climbing from a left child to a parent greater than val (or from
+        a right child to a parent less than val) means val lies between
+        the finger and that parent, so within the child's subtree. Returns
+        the parent itself if it holds val.
+        """
+        node = self._finger or self.root
+        if val == node.val:
+            return node
+        above = val > node.val
+        parent = node.parent
+        compared = 0
+        while parent:
+            compared += 1
+            if val == parent.val:
+                node = parent
+                break
+            if above:
+                if node is parent.left and val < parent.val:
+                    break
+            elif node is parent.right and parent.val < val:
+                break
+            node = parent
+            parent = node.parent
+        self._compared += compared
+        return node
+
+    def _finger_search(self, val):
+        """Search from the finger, leaving it on the last node visited."""
+        if self.root is None:
+            return None
+        cur = self._finger_start(val)
+        compared = 0
+        while True:
+            compared += 1
+            if val == cur.val:
+                self._compared += compared
+                self._finger = cur
+                return cur
+            nxt = cur.left if val < cur.val else cur.right
+            if nxt is None:
+                self._compared += compared
+                self._finger = cur
+                return None
+            cur = nxt
 
     def delete(self, val, error=False):
         """Delete a node and reorganize tree as needed."""
+        if self.stats_hook:
+            return self._with_stats('delete', val, self.delete, val, error)
         to_d = self.search(val)
         if error and to_d is None:
             raise ValueError('Not in tree.')
+        if self.persistent:
+            self._check_writable()
+            if to_d:
+                self.root = self._persistent_delete(self.root, val)
+                self._size -= 1
+            return
         if to_d:
             replacement = None
             check_from = to_d.parent
@@ -77,6 +389,8 @@ class BinaryTree(object):
                 else:
                     lmost = self.node_furthest('left', from_=to_d.right)
                     replacement = lmost
+                    lmost.depth = to_d.depth
+                    lmost.size = to_d.size
                     if lmost.parent is to_d:
                         check_from = lmost
                     else:
@@ -95,17 +409,346 @@ class BinaryTree(object):
                     lmost.parent = to_d.parent
             if to_d.parent is None:
                 self.root = replacement
-            if check_from:
-                self._bubble_up_depth_from(check_from)
-            if self.autobalance:
-                r_root = self._find_unbalanced(check_from)
-                if r_root:
-                    self._rebalance(r_root)
+            if self.finger:
+                self._finger = replacement or check_from
+            self._retrace(check_from, -1)
+            if (self.balancer == 'scapegoat' and self.autobalance and
+                    self._size < self.scapegoat_alpha * self._max_size):
+                self.rebuilds += 1
+                self._relink_nodes(list(self.in_order(attr=None)))
+
+    def _with_stats(self, op, val, method, *args):
+        """
+        Call method(*args) with stats_hook off, then report it as op on val.
+
+        Comparisons are counted by the search loops the method runs, so
+        they include climbing from a finger and any search made before a
+        write.
+        """
+        hook = self.stats_hook
+        rotations = self.rotations
+        self._retraced = 0
+        self._compared = 0
+        self.stats_hook = None
+        try:
+            result = method(*args)
+        finally:
+            self.stats_hook = hook
+        hook(OpStats(op, val, self._compared,
+                     self.rotations - rotations, self._retraced))
+        return result
+
+    def _set_value(self, node, value):
+        """Set value of node, updating aggregates above it."""
+        node.value = value
+        if node.agg_spec:
+            while node:
+                node.refresh_agg()
+                node = node.parent
+
+    def _check_writable(self):
+        """Raise TypeError if tree is a read-only snapshot."""
+        if self.read_only:
+            raise TypeError('Cannot modify a tree snapshot.')
+
+    def _own(self, node):
+        """Return node if this tree may modify it, otherwise a copy of it."""
+        if node.gen is self._gen:
+            return node
+        copy = BinaryTreeNode(node.val, left=node.left, right=node.right)
+        copy.depth = node.depth
+        copy.size = node.size
+        copy.gen = self._gen
+        if node.agg_spec:
+            copy.agg_spec = node.agg_spec
+            copy.agg = node.agg
+        return copy
+
+    def update(self, iterable):
+        """
+        Insert every value of iterable.
+
+        Small batches are inserted one by one. Large ones are sorted and
+        merged with the tree's values in a single in order pass, then the
+        nodes are relinked into a balanced tree, in O(n + m log m).
+        """
+        items = list(iterable)
+        if len(items) * self.bulk_ratio < self._size:
+            for item in items:
+                self.insert(item)
+            return
+        self._check_writable()
+        merged = []
+        old_nodes = self.in_order(attr=None)
+        old = next(old_nodes, None)
+        for new in self._nodes_for(items):
+            while old is not None and old.val < new.val:
+                merged.append(old)
+                old = next(old_nodes, None)
+            if old is not None and old.val == new.val:
+                self._merge_equal(old, new)
+            else:
+                merged.append(new)
+        if old is not None:
+            merged.append(old)
+            merged.extend(old_nodes)
+        self._relink_nodes(merged)
+
+    def delete_many(self, iterable):
+        """
+        Delete every value of iterable that is in the tree.
+
+        Like update(), large batches filter the tree's values in one in
+        order pass and relink the rest, in O(n + m log m).
+        """
+        vals = list(iterable)
+        if len(vals) * self.bulk_ratio < self._size:
+            for val in vals:
+                self.delete(val)
+            return
+        self._check_writable()
+        doomed = iter(unique_sorted(sorted(vals)))
+        gone = next(doomed, None)
+        kept = []
+        for node in self.in_order(attr=None):
+            while gone is not None and gone < node.val:
+                gone = next(doomed, None)
+            if gone is None or node.val != gone:
+                kept.append(node)
+        self._relink_nodes(kept)
+
+    def _nodes_for(self, items):
+        """Return new nodes for items, sorted with duplicates removed."""
+        return [self._new_node(val) for val in unique_sorted(sorted(items))]
+
+    def _merge_equal(self, old, new):
+        """Fold new node into old node holding the same value."""
+
+    def _relink_nodes(self, nodes):
+        """Relink sorted nodes into a balanced tree holding only them."""
+        if self.persistent:
+            nodes = [self._own(node) for node in nodes]
+        self.root = link_nodes(nodes, 0, len(nodes),
+                               parents=not self.persistent)
+        self._size = self._max_size = len(nodes)
+        self._finger = None
+
+    def _persistent_insert(self, node, val):
+        """Insert val under node by path copying, return new subtree root."""
+        if node is None:
+            return self._new_node(val)
+        node = self._own(node)
+        if val < node.val:
+            node.left = self._persistent_insert(node.left, val)
+        else:
+            node.right = self._persistent_insert(node.right, val)
+        return self._persistent_fix(node)
+
+    def _persistent_delete(self, node, val):
+        """Delete val under node by path copying, return new subtree root."""
+        if val == node.val:
+            if node.left is None or node.right is None:
+                return node.left or node.right
+            right, successor = self._persistent_pop_min(node.right)
+            successor.left = node.left
+            successor.right = right
+            return self._persistent_fix(successor)
+        node = self._own(node)
+        if val < node.val:
+            node.left = self._persistent_delete(node.left, val)
+        else:
+            node.right = self._persistent_delete(node.right, val)
+        return self._persistent_fix(node)
+
+    def _persistent_pop_min(self, node):
+        """Detach smallest node under node, return (new root, that node)."""
+        if node.left is None:
+            return node.right, self._own(node)
+        node = self._own(node)
+        node.left, smallest = self._persistent_pop_min(node.left)
+        return self._persistent_fix(node), smallest
+
+    def _persistent_fix(self, node):
+        """Update an owned node's fields and rebalance it if needed."""
+        self._retraced += 1
+        _refresh(node)
+        if not self.autobalance:
+            return node
+        balance = height(node.left) - height(node.right)
+        if balance > 1:
+            self.rotations += 1
+            if height(node.left.left) < height(node.left.right):
+                node.left = self._persistent_rotate(node.left, 'left')
+            return self._persistent_rotate(node, 'right')
+        if balance < -1:
+            self.rotations += 1
+            if height(node.right.right) < height(node.right.left):
+                node.right = self._persistent_rotate(node.right, 'right')
+            return self._persistent_rotate(node, 'left')
+        return node
+
+    def _persistent_rotate(self, node, direction):
+        """Rotate node in direction, copying the nodes it changes."""
+        up = 'right' if direction == 'left' else 'left'
+        node = self._own(node)
+        new_root = self._own(getattr(node, up))
+        setattr(node, up, getattr(new_root, direction))
+        setattr(new_root, direction, node)
+        _refresh(node)
+        return _refresh(new_root)
 
     def contains(self, val):
         """Return whether val in bst."""
         return bool(self.search(val))
 
+    def floor(self, val):
+        """Return node with largest value <= val, None if there is none."""
+        return self._closest(val, below=True, strict=False)
+
+    def ceiling(self, val):
+        """Return node with smallest value >= val, None if there is none."""
+        return self._closest(val, below=False, strict=False)
+
+    def predecessor(self, val):
+        """Return node with largest value < val, None if there is none."""
+        return self._closest(val, below=True, strict=True)
+
+    def successor(self, val):
+        """Return node with smallest value > val, None if there is none."""
+        return self._closest(val, below=False, strict=True)
+
+    def _closest(self, val, below, strict):
+        """Return node closest to val on one side, O(log n)."""
+        best = None
+        cur = self.root
+        while cur:
+            if val == cur.val and not strict:
+                return cur
+            on_side = cur.val < val if below else val < cur.val
+            if on_side:
+                best = cur
+                cur = cur.right if below else cur.left
+            else:
+                cur = cur.left if below else cur.right
+        return best
+
+    def irange(self, lo=None, hi=None, inclusive=(True, True),
+               reverse=False, attr='val'):
+        """
+        Return a generator of values between lo and hi, in order.
+
+        None for lo or hi means unbounded on that side. Subtrees entirely
+        outside the bounds are never visited, so a scan costs O(log n + k)
+        for k values yielded.
+        """
+        def above_lo(v):
+            return lo is None or (lo <= v if inclusive[0] else lo < v)
+
+        def below_hi(v):
+            return hi is None or (v <= hi if inclusive[1] else v < hi)
+
+        if reverse:
+            near, far, in_near, in_far = 'right', 'left', below_hi, above_lo
+        else:
+            near, far, in_near, in_far = 'left', 'right', above_lo, below_hi
+        stack = []
+        node = self.root
+        while stack or node:
+            if node:
+                if in_near(node.val):
+                    stack.append(node)
+                    node = getattr(node, near)
+                else:
+                    node = getattr(node, far)
+            else:
+                node = stack.pop()
+                if not in_far(node.val):
+                    return
+                yield getattr(node, attr) if attr else node
+                node = getattr(node, far)
+
+    def aggregate(self, lo=None, hi=None, inclusive=(True, True),
+                  default=None):
+        """
+        Return aggregate of the nodes with values between lo and hi.
+
+        Combines O(log n) cached subtree aggregates, in order. None for lo
+        or hi means unbounded; default is returned for an empty range.
+        """
+        if not self.agg_spec:
+            raise TypeError('Tree was not created with an aggregate.')
+        func, measure = self.agg_spec
+
+        def above_lo(v):
+            return lo is None or (lo <= v if inclusive[0] else lo < v)
+
+        def below_hi(v):
+            return hi is None or (v <= hi if inclusive[1] else v < hi)
+
+        def combine(first, second):
+            if first is _MISSING:
+                return second
+            if second is _MISSING:
+                return first
+            return func(first, second)
+
+        def agg_range(node, bounded_lo, bounded_hi):
+            while node:
+                if bounded_lo and not above_lo(node.val):
+                    node = node.right
+                elif bounded_hi and not below_hi(node.val):
+                    node = node.left
+                elif not (bounded_lo or bounded_hi):
+                    return node.agg
+                else:
+                    res = agg_range(node.left, bounded_lo, False)
+                    res = combine(res, measure(node))
+                    return combine(res, agg_range(node.right, False,
+                                                  bounded_hi))
+            return _MISSING
+
+        res = agg_range(self.root, lo is not None, hi is not None)
+        return default if res is _MISSING else res
+
+    def rank(self, val, inclusive=False):
+        """
+        Return number of values in tree less than val in O(log n).
+
+        With inclusive=True, count values less than or equal to val.
+        """
+        count = 0
+        cur = self.root
+        while cur:
+            if val < cur.val or (val == cur.val and not inclusive):
+                cur = cur.left
+            else:
+                count += 1 + (cur.left.size if cur.left else 0)
+                cur = cur.right
+        return count
+
+    def select(self, k):
+        """Return node with the kth smallest value (from 0) in O(log n)."""
+        if k < 0:
+            k += self._size
+        if not 0 <= k < self._size:
+            raise IndexError('Tree index out of range.')
+        cur = self.root
+        while True:
+            left_size = cur.left.size if cur.left else 0
+            if k < left_size:
+                cur = cur.left
+            elif k == left_size:
+                return cur
+            else:
+                k -= left_size + 1
+                cur = cur.right
+
+    def count_between(self, lo, hi, inclusive=(True, True)):
+        """Return number of values between lo and hi in O(log n)."""
+        count = (self.rank(hi, inclusive=inclusive[1]) -
+                 self.rank(lo, inclusive=not inclusive[0]))
+        return max(count, 0)
+
     def balance(self, from_='root'):
         """Return left vs right balance from a node on the bst."""
         if from_ == 'root':
@@ -120,70 +763,231 @@ class BinaryTree(object):
         """Return a generator of pre-order traversal."""
         if start == 'root':
             start = self.root
-        if start:
-            yield getattr(start, attr) if attr else start
-            for node in start.children():
-                for child in self.pre_order(start=node, attr=attr):
-                    yield child
+        stack = [start] if start else []
+        while stack:
+            node = stack.pop()
+            yield getattr(node, attr) if attr else node
+            if node.right:
+                stack.append(node.right)
+            if node.left:
+                stack.append(node.left)
 
     def post_order(self, start='root', attr='val'):
         """Return a generator of post-order traversal."""
         if start == 'root':
             start = self.root
-        if start:
-            for node in start.children():
-                for child in self.post_order(start=node, attr=attr):
-                    yield child
-            yield getattr(start, attr) if attr else start
+        stack, last = [], None
+        node = start
+        while stack or node:
+            if node:
+                stack.append(node)
+                node = node.left
+                continue
+            peek = stack[-1]
+            if peek.right and peek.right is not last:
+                node = peek.right
+            else:
+                last = stack.pop()
+                yield getattr(last, attr) if attr else last
 
     def in_order(self, start='root', attr='val'):
         """Return a generator of tree's nodes in order."""
         if start == 'root':
             start = self.root
-        if start:
-            for child in self.in_order(start=start.left, attr=attr):
-                yield child
-            yield getattr(start, attr) if attr else start
-            for child in self.in_order(start=start.right, attr=attr):
-                yield child
-
-    def breadth_first(self, start='root', attr='val'):
-        """Return generator of breadth first traversal of tree rooted at root."""
+        stack = []
+        node = start
+        while stack or node:
+            if node:
+                stack.append(node)
+                node = node.left
+            else:
+                node = stack.pop()
+                yield getattr(node, attr) if attr else node
+                node = node.right
+
+    def freeze(self, typecode=None):
+        """
+        Return a read-only FrozenTree of the current values in O(n).
+
+        Pass an array typecode (e.g. 'q' or 'd') to pack numeric values.
+        """
+        return FrozenTree(self.in_order(), typecode=typecode)
+
+    def dump(self, fileobj, typecode=None):
+        """
+        Write the tree to binary fileobj without recursion, in O(n).
+
+        Writes a header, one byte per node in pre-order saying which
+        children it has, then the keys in pre-order: pickled as one flat
+        list, or with an array typecode (e.g. 'q' or 'd') as a raw array
+        starting at a multiple of 8 bytes into the stream, so a mapped
+        file can be read in place with memoryview(...).cast(typecode).
+        Map values follow, pickled, for a TreeMap.
+        """
+        nodes = list(self.pre_order(attr=None))
+        flags = DUMP_VALUES if self._dump_values else 0
+        if sys.byteorder == 'big':
+            flags |= DUMP_BIG_ENDIAN
+        fileobj.write(DUMP_HEADER.pack(
+            DUMP_MAGIC, 1, (typecode or '\0').encode(), flags, len(nodes)))
+        fileobj.write(bytes(bytearray(
+            (node.left is not None) | (node.right is not None) << 1
+            for node in nodes)))
+        keys = [node.val for node in nodes]
+        if typecode:
+            pad = -(DUMP_HEADER.size + len(nodes)) % 8
+            fileobj.write(b'\0' * pad)
+            array(typecode, keys).tofile(fileobj)
+        else:
+            pickle.dump(keys, fileobj, pickle.HIGHEST_PROTOCOL)
+        if self._dump_values:
+            pickle.dump([node.value for node in nodes], fileobj,
+                        pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, fileobj, **kwargs):
+        """
+        Return tree read from a stream written by dump(), in O(n).
+
+        Nodes are relinked in the dumped shape, with no comparisons or
+        rebalancing. Keyword arguments go to the constructor.
+        """
+        header = fileobj.read(DUMP_HEADER.size)
+        if len(header) != DUMP_HEADER.size:
+            raise ValueError('Truncated tree dump.')
+        magic, version, typecode, flags, num = DUMP_HEADER.unpack(header)
+        if magic != DUMP_MAGIC or version != 1:
+            raise ValueError('Not a tree dump.')
+        shape = bytearray(fileobj.read(num))
+        try:
+            if typecode != b'\0':
+                fileobj.read(-(DUMP_HEADER.size + num) % 8)
+                keys = array(typecode.decode())
+                keys.fromfile(fileobj, num)
+                if bool(flags & DUMP_BIG_ENDIAN) != (sys.byteorder == 'big'):
+                    keys.byteswap()
+            else:
+                keys = pickle.load(fileobj)
+            values = pickle.load(fileobj) if flags & DUMP_VALUES else None
+        except EOFError:
+            raise ValueError('Truncated tree dump.')
+        if len(shape) != num or len(keys) != num:
+            raise ValueError('Truncated tree dump.')
+        tree = cls(**kwargs)
+        if values is None:
+            nodes = [tree._new_node(key) for key in keys]
+        else:
+            nodes = [tree._new_node(key, value=value)
+                     for key, value in zip(keys, values)]
+        tree.root = link_preorder(nodes, shape, parents=not tree.persistent)
+        tree._size = tree._max_size = num
+        return tree
+
+    def cursor(self, val=None, attr='val'):
+        """
+        Return a TreeCursor over the tree.
+
+        If val is given, the cursor is positioned at the smallest value
+        greater than or equal to val, otherwise at the smallest value.
+        """
+        cur = TreeCursor(self, attr=attr)
+        if val is None:
+            cur.first()
+        else:
+            cur.seek(val)
+        return cur
+
+    def breadth_first(self, start='root', attr='val', max_depth=None):
+        """
+        Return generator of breadth first traversal of tree rooted at start.
+
+        O(n) overall; with max_depth only that many levels are visited,
+        start being level 1.
+        """
+        for level in self.levels(start, attr, max_depth):
+            for item in level:
+                yield item
+
+    def levels(self, start='root', attr='val', max_depth=None):
+        """
+        Return generator of the levels under start as lists, top down.
+
+        Each level is built from the one above only when it is asked for.
+        """
         if start == 'root':
             start = self.root
-        parent_queue = []
-        if start:
-            parent_queue.append(start)
-        while parent_queue:
-            parent = parent_queue.pop(0)
-            yield getattr(parent, attr) if attr else parent
-            parent_queue.extend(parent.children())
+        for level in level_order(start, max_depth):
+            yield [getattr(node, attr) for node in level] if attr else level
+
+    def _retrace(self, node, delta):
+        """
+        Fix depths, sizes and balance from node up after a change.
+
+        delta is the change in size of node's subtree (1 after insert,
+        -1 after delete). Depths and balance are only checked until a
+        subtree's depth comes out unchanged, since nothing above it can
+        have changed; past that point only sizes need updating.
+        """
+        retraced = 0
+        rotate = self.autobalance and self.balancer == 'avl'
+        while node:
+            retraced += 1
+            old_depth = node.depth
+            _refresh(node)
+            if rotate and abs(self.balance(from_=node)) > 1:
+                node = self._rebalance(node)
+            if node.depth == old_depth:
+                node = node.parent
+                break
+            node = node.parent
+        while node:
+            node.size += delta
+            if node.agg_spec:
+                node.refresh_agg()
+            node = node.parent
+        self._retraced = retraced
+
+    def _rebuild_if_deep(self, node):
+        """Rebuild subtree of a scapegoat above new node if it is too deep."""
+        if self._size > self._max_size:
+            self._max_size = self._size
+        alpha = self.scapegoat_alpha
+        limit = math.log(self._size, 1 / alpha)
+        if self.root.depth - 1 <= limit:
+            return
+        depth = 0
+        above = node.parent
+        while above:
+            depth += 1
+            above = above.parent
+        if depth <= limit:
+            return
+        while node.parent and node.size <= alpha * node.parent.size:
+            node = node.parent
+        scapegoat = node.parent or node
+        above = scapegoat.parent
+        nodes = list(self.in_order(start=scapegoat, attr=None))
+        subtree = link_nodes(nodes, 0, len(nodes), above)
+        self.rebuilds += 1
+        if above is None:
+            self.root = subtree
+            return
+        if above.left is scapegoat:
+            above.left = subtree
+        else:
+            above.right = subtree
+        self._retrace(above, 0)
 
     def _rebalance(self, node):
-        """Rebalance a tree starting at node."""
+        """Rotate unbalanced node, return root of the rotated subtree."""
         self.rotations += 1
         if self.balance(from_=node) < 0:
             if self.balance(from_=node.right) <= 0:
-                r_root = self._lr(node)
-            else:
-                r_root = self._rlr(node)
-        else:
-            if self.balance(from_=node.left) >= 0:
-                r_root = self._rr(node)
-            else:
-                r_root = self._lrr(node)
-        self._reset_depths_from(r_root)
-        self._bubble_up_depth_from(r_root)
-        next_node = self._find_unbalanced(node)
-        if next_node:
-            self._rebalance(next_node)
-
-    def _find_unbalanced(self, node):
-        """Bubble up from a node and check for unbalanced trees."""
-        while node:
-            if abs(self.balance(from_=node)) > 1:
-                return node
-            node = node.parent
+                return self._lr(node)
+            return self._rlr(node)
+        if self.balance(from_=node.left) >= 0:
+            return self._rr(node)
+        return self._lrr(node)
 
     def _lr(self, old_root):
         r"""
@@ -205,6 +1009,8 @@ class BinaryTree(object):
         new_root.parent = old_root.parent
         new_root.left = old_root
         old_root.parent = new_root
+        _refresh(old_root)
+        _refresh(new_root)
         return new_root
 
     def _rr(self, old_root):
@@ -227,6 +1033,8 @@ class BinaryTree(object):
         new_root.right = old_root
         new_root.parent = old_root.parent
         old_root.parent = new_root
+        _refresh(old_root)
+        _refresh(new_root)
         return new_root
 
     def _lrr(self, old_root):
@@ -252,6 +1060,9 @@ class BinaryTree(object):
         new_root.left = left_root
         old_root.parent = new_root
         left_root.parent = new_root
+        _refresh(old_root)
+        _refresh(left_root)
+        _refresh(new_root)
         return new_root
 
     def _rlr(self, old_root):
@@ -277,23 +1088,11 @@ class BinaryTree(object):
         new_root.right = right_root
         old_root.parent = new_root
         right_root.parent = new_root
+        _refresh(old_root)
+        _refresh(right_root)
+        _refresh(new_root)
         return new_root
 
-    def _bubble_up_depth_from(self, node):
-        children = node.children()
-        node.depth = 1
-        if children:
-            node.depth += max(c.depth for c in children)
-        if node.parent:
-            self._bubble_up_depth_from(node.parent)
-
-    def _reset_depths_from(self, node):
-        children = node.children()
-        node.depth = 1
-        if children:
-            node.depth += max(self._reset_depths_from(c) for c in children)
-        return node.depth
-
     def node_furthest(self, direction, from_='root'):
         """Traverse as far as possible in direction from from_."""
         if from_ == 'root':
@@ -309,6 +1108,18 @@ class BinaryTree(object):
         """Return number of nodes in bst."""
         return self._size
 
+    def __getitem__(self, k):
+        """Return kth smallest value in tree, negative k counts from end."""
+        return self.select(k).val
+
+    def __iter__(self):
+        """Iterate over values in order."""
+        return self.in_order()
+
+    def __contains__(self, val):
+        """Return whether val in bst."""
+        return self.contains(val)
+
     def __repr__(self):
         """Return representation of tree instance."""
         instance, iD = super(BinaryTree, self).__repr__().split('object')
@@ -329,7 +1140,7 @@ class BinaryTree(object):
         """Return string depiction of tree."""
         if self.root is None:
             return 'Empty'
-        head = self.display_rows_from(self.root, 5, lambda n: n.val)
+        head = display_rows_from(self.root, 5, lambda n: n.val)
         if self.root.depth > 5:
             head += '\n\t...'
         return head
@@ -338,6 +1149,14 @@ class BinaryTree(object):
 class BinaryTreeNode(object):
     """Node object with helper methods for use in a Binary Tree."""
 
+    # token of the persistent tree allowed to modify this node in place
+    gen = None
+    # value mapped to val when node belongs to a TreeMap
+    value = None
+    # (function, measure) and cached subtree aggregate of aggregated trees
+    agg_spec = None
+    agg = None
+
     def __init__(self, val, left=None, right=None, parent=None):
         """Set attributes on node object."""
         self.val = val
@@ -345,6 +1164,7 @@ class BinaryTreeNode(object):
         self.right = right
         self.parent = parent
         self.depth = 1
+        self.size = 1
 
     @property
     def balance(self):
@@ -357,6 +1177,24 @@ class BinaryTreeNode(object):
         """Return whether node has no children."""
         return not (self.right or self.left)
 
+    def refresh_size(self):
+        """Recompute number of nodes in subtree rooted at this node."""
+        self.size = 1
+        if self.left:
+            self.size += self.left.size
+        if self.right:
+            self.size += self.right.size
+
+    def refresh_agg(self):
+        """Recompute aggregate of subtree rooted at this node."""
+        func, measure = self.agg_spec
+        agg = measure(self)
+        if self.left:
+            agg = func(self.left.agg, agg)
+        if self.right:
+            agg = func(agg, self.right.agg)
+        self.agg = agg
+
     def children(self):
         """Return non-none children of node."""
         return [node for node in [self.left, self.right] if node]
@@ -376,20 +1214,634 @@ class BinaryTreeNode(object):
                 self.parent.right = new_child
 
 
+class TreeCursor(object):
+    """
+    Bidirectional cursor over the values of a BinaryTree, in order.
+
+    The cursor sits before an item: next() returns that item and moves
+    forward, prev() moves back and returns the item it moves over, so
+    calling next() then prev() returns the same item twice.
+
+    The cursor keeps the path from the root to its position, so next()
+    and prev() are amortized O(1) and a paused scan resumes where it
+    left off. Inserting into or deleting from the tree invalidates the
+    path; call seek() again afterwards.
+    """
+
+    def __init__(self, tree, attr='val'):
+        """Set tree and attr, position cursor past the last item."""
+        self.tree = tree
+        self.attr = attr
+        self._path = []
+
+    @property
+    def node(self):
+        """Node the cursor is positioned at, None if past the end."""
+        return self._path[-1] if self._path else None
+
+    def first(self):
+        """Position cursor at the smallest value."""
+        self._path = []
+        self._extend('left', self.tree.root)
+
+    def last(self):
+        """Position cursor past the largest value."""
+        self._path = []
+
+    def seek(self, val):
+        """
+        Position cursor at the smallest value greater than or equal to val.
+
+        Return whether val itself is in the tree.
+        """
+        path, ceil_depth = [], 0
+        cur = self.tree.root
+        while cur:
+            path.append(cur)
+            if val == cur.val:
+                self._path = path
+                return True
+            if val < cur.val:
+                ceil_depth = len(path)
+                cur = cur.left
+            else:
+                cur = cur.right
+        self._path = path[:ceil_depth]
+        return False
+
+    def next(self):
+        """Return value at cursor and advance. Raise StopIteration at end."""
+        path = self._path
+        if not path:
+            raise StopIteration
+        node = path[-1]
+        if node.right:
+            self._extend('left', node.right)
+        else:
+            child = path.pop()
+            while path and path[-1].right is child:
+                child = path.pop()
+        return getattr(node, self.attr) if self.attr else node
+
+    __next__ = next
+
+    def prev(self):
+        """Step back and return value. Raise StopIteration at start."""
+        path = self._path
+        if not path:
+            if self.tree.root is None:
+                raise StopIteration
+            self._extend('right', self.tree.root)
+        elif path[-1].left:
+            self._extend('right', path[-1].left)
+        else:
+            i = len(path) - 1
+            while i and path[i - 1].left is path[i]:
+                i -= 1
+            if not i:
+                raise StopIteration
+            del path[i:]
+        node = path[-1]
+        return getattr(node, self.attr) if self.attr else node
+
+    def _extend(self, direction, node):
+        """Push node and its furthest descendants in direction onto path."""
+        while node:
+            self._path.append(node)
+            node = getattr(node, direction)
+
+    def __iter__(self):
+        """Return self, iteration continues from current position."""
+        return self
+
+
+class TreeMap(BinaryTree):
+    """
+    AVL tree mapping keys to values.
+
+    Each node's val is its key, which is all the tree ever compares, and
+    its value attribute holds the mapped value, so no (key, value) tuples
+    are built or compared. With a key function, insert(item) stores item
+    under key(item), computing the key once.
+
+    Indexing is by key: tree[key] -> value. Use select(k).value for the
+    value at a position.
+    """
+
+    _dump_values = True
+
+    def __init__(self, iterable=None, key=None, autobalance=True,
+                 aggregate=None, measure=None, balancer='avl', finger=False):
+        """Initialize map, inserting each item of iterable."""
+        super(TreeMap, self).__init__(
+            autobalance=autobalance, aggregate=aggregate,
+            measure=measure or operator.attrgetter('value'),
+            balancer=balancer, finger=finger)
+        self.key = key
+        if iterable:
+            for item in iterable:
+                self.insert(item)
+
+    @classmethod
+    def from_sorted(cls, iterable, presorted=True, key=None, **kwargs):
+        """
+        Build a balanced map of items in O(n).
+
+        Items are stored like insert() stores them, so for duplicate keys
+        the last item is kept. With presorted=True they must already be in
+        ascending key order.
+        """
+        tree = cls(key=key, **kwargs)
+        items = list(iterable)
+        if not presorted:
+            items.sort(key=key)
+        keys = [key(item) for item in items] if key else items
+        last = len(keys) - 1
+        tree._relink_nodes([
+            tree._new_node(keys[i], value=items[i])
+            for i in range(len(keys)) if i == last or keys[i] != keys[i + 1]
+        ])
+        return tree
+
+    def _empty_like(self, **kwargs):
+        """Return an empty map with the same settings as this one."""
+        return super(TreeMap, self)._empty_like(key=self.key, **kwargs)
+
+    @classmethod
+    def join(cls, left, item, right):
+        """
+        Return a new map holding left's items, item and right's items.
+
+        item is stored like insert() stores it, and its key must lie
+        between left's keys and right's keys.
+        """
+        key = left.key(item) if left.key else item
+        return left._join(key, item, right)
+
+    def _nodes_for(self, items):
+        """Return new nodes for items by key, later duplicates winning."""
+        key = self.key
+        items = sorted(items, key=key)
+        nodes = []
+        for item in items:
+            val = key(item) if key else item
+            if nodes and nodes[-1].val == val:
+                nodes[-1].value = item
+            else:
+                nodes.append(self._new_node(val, value=item))
+        return nodes
+
+    def _merge_equal(self, old, new):
+        """Replace old node's value with the new one's."""
+        old.value = new.value
+
+    def insert(self, item):
+        """Store item under key(item), or item itself with no key function."""
+        key = self.key(item) if self.key else item
+        if self.stats_hook:
+            self._with_stats(
+                'insert', key, self._insert_node, key, item)
+            return
+        self._insert_node(key, value=item)
+
+    def get(self, key, default=None):
+        """Return value for key if key in map, otherwise default."""
+        node = self.search(key)
+        return default if node is None else node.value
+
+    def pop(self, key, *default):
+        """Remove key and return its value, or default if given."""
+        node = self.search(key)
+        if node is None:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        self.delete(key)
+        return node.value
+
+    def setdefault(self, key, default=None):
+        """Return value for key, inserting key with default if missing."""
+        if self.stats_hook:
+            return self._with_stats(
+                'insert', key, self.setdefault, key, default)
+        node = self.search(key)
+        if node is None:
+            node = self._insert_node(key, value=default)
+        return node.value
+
+    def items(self, lo=None, hi=None, inclusive=(True, True), reverse=False):
+        """Return a generator of (key, value) pairs with keys in range."""
+        return ((node.val, node.value) for node in
+                self.irange(lo, hi, inclusive, reverse, attr=None))
+
+    def keys(self, lo=None, hi=None, inclusive=(True, True), reverse=False):
+        """Return a generator of keys in range."""
+        return self.irange(lo, hi, inclusive, reverse)
+
+    def values(self, lo=None, hi=None, inclusive=(True, True), reverse=False):
+        """Return a generator of values with keys in range."""
+        return self.irange(lo, hi, inclusive, reverse, attr='value')
+
+    def __getitem__(self, key):
+        """Return value for key, raise KeyError if missing."""
+        node = self.search(key)
+        if node is None:
+            raise KeyError(key)
+        return node.value
+
+    def __setitem__(self, key, value):
+        """Map key to value."""
+        if self.stats_hook:
+            self._with_stats(
+                'insert', key, self._insert_node, key, value)
+            return
+        self._insert_node(key, value=value)
+
+    def __delitem__(self, key):
+        """Remove key, raise KeyError if missing."""
+        self.pop(key)
+
+
+class IntervalTree(BinaryTree):
+    """
+    AVL tree of closed intervals answering overlap queries.
+
+    Intervals are tuples (start, end, ...) ordered as tuples, so extra
+    items such as a payload ride along and break ties. Each node caches
+    the largest end in its subtree as its aggregate, kept current by the
+    usual retracing and rotations, which lets queries skip every subtree
+    ending before the query starts.
+    """
+
+    def __init__(self, iterable=None, autobalance=True, persistent=False,
+                 balancer='avl', finger=False):
+        """Initialize tree with max-end aggregates, inserting iterable."""
+        super(IntervalTree, self).__init__(
+            autobalance=autobalance, persistent=persistent,
+            aggregate='max', measure=_interval_end, balancer=balancer,
+            finger=finger)
+        if iterable:
+            for interval in iterable:
+                self.insert(interval)
+
+    def _empty_like(self, **kwargs):
+        """Return an empty tree with the same settings as this one."""
+        return type(self)(autobalance=self.autobalance,
+                          balancer=self.balancer, finger=self.finger, **kwargs)
+
+    def _new_node(self, val, parent=None, value=_MISSING):
+        """Return a new node for interval val, checking its endpoints."""
+        if val[1] < val[0]:
+            raise ValueError('Interval ends before it starts: {!r}'.format(val))
+        return super(IntervalTree, self)._new_node(val, parent, value)
+
+    def overlapping(self, lo, hi):
+        """
+        Yield intervals sharing at least a point with [lo, hi], in order.
+
+        O(log n + k): subtrees whose largest end is below lo are skipped,
+        and the walk stops at the first interval starting after hi.
+        """
+        stack = []
+        node = self.root
+        while True:
+            if node is not None and node.agg >= lo:
+                stack.append(node)
+                node = node.left
+                continue
+            if not stack:
+                return
+            node = stack.pop()
+            if node.val[0] > hi:
+                return
+            if node.val[1] >= lo:
+                yield node.val
+            node = node.right
+
+    def stabbing(self, point):
+        """Yield intervals containing point, in order."""
+        return self.overlapping(point, point)
+
+
+class BPlusTree(object):
+    """
+    B+ tree with linked leaves.
+
+    Every value lives in a leaf; internal nodes only hold separator keys.
+    Nodes hold up to fanout keys and are searched with bisect, so a lookup
+    makes O(log_fanout n) node hops. Leaves are linked both ways, making
+    in order and range scans a walk along the leaf level.
+    """
+
+    def __init__(self, iterable=None, fanout=64):
+        """Initialize tree with an empty leaf as root."""
+        if fanout < 3:
+            raise ValueError('fanout must be at least 3.')
+        self.fanout = fanout
+        self.root = BPlusNode()
+        self._size = 0
+        if iterable:
+            for val in iterable:
+                self.insert(val)
+
+    def insert(self, val):
+        """Insert val into the tree, ignore it if already present."""
+        leaf, path = self._find_leaf(val)
+        i = bisect_left(leaf.keys, val)
+        if i < len(leaf.keys) and leaf.keys[i] == val:
+            return
+        leaf.keys.insert(i, val)
+        self._size += 1
+        node = leaf
+        while len(node.keys) > self.fanout:
+            sep, right = node.split()
+            if path:
+                parent, i = path.pop()
+                parent.keys.insert(i, sep)
+                parent.children.insert(i + 1, right)
+                node = parent
+            else:
+                self.root = BPlusNode([sep], [node, right])
+                break
+
+    def search(self, val):
+        """Return leaf holding val if it exists, otherwise None."""
+        node = self.root
+        while node.children is not None:
+            node = node.children[bisect_right(node.keys, val)]
+        i = bisect_left(node.keys, val)
+        if i < len(node.keys) and node.keys[i] == val:
+            return node
+
+    def contains(self, val):
+        """Return whether val in tree."""
+        return self.search(val) is not None
+
+    def delete(self, val, error=False):
+        """Delete val from the tree, merging underfull nodes."""
+        leaf, path = self._find_leaf(val)
+        i = bisect_left(leaf.keys, val)
+        if i == len(leaf.keys) or leaf.keys[i] != val:
+            if error:
+                raise ValueError('Not in tree.')
+            return
+        del leaf.keys[i]
+        self._size -= 1
+        node = leaf
+        while path and len(node.keys) < self.fanout // 2:
+            parent, i = path.pop()
+            self._fill(parent, i)
+            node = parent
+        root = self.root
+        if root.children is not None and not root.keys:
+            self.root = root.children[0]
+
+    def in_order(self):
+        """Return a generator of the tree's values in order."""
+        return self.irange()
+
+    def irange(self, lo=None, hi=None, inclusive=(True, True), reverse=False):
+        """
+        Return a generator of values between lo and hi, in order.
+
+        None for lo or hi means unbounded on that side. Finds the first
+        leaf in O(log n) then follows leaf links.
+        """
+        if reverse:
+            if hi is None:
+                leaf, i = self._furthest_leaf(-1), None
+            else:
+                leaf = self._find_leaf(hi)[0]
+                find = bisect_right if inclusive[1] else bisect_left
+                i = find(leaf.keys, hi)
+            while leaf:
+                keys = leaf.keys
+                for j in range(len(keys) - 1 if i is None else i - 1, -1, -1):
+                    val = keys[j]
+                    if lo is not None and (
+                            val < lo or (val == lo and not inclusive[0])):
+                        return
+                    yield val
+                leaf, i = leaf.prev, None
+        else:
+            if lo is None:
+                leaf, i = self._furthest_leaf(0), 0
+            else:
+                leaf = self._find_leaf(lo)[0]
+                find = bisect_left if inclusive[0] else bisect_right
+                i = find(leaf.keys, lo)
+            while leaf:
+                keys = leaf.keys
+                for j in range(i, len(keys)):
+                    val = keys[j]
+                    if hi is not None and (
+                            hi < val or (val == hi and not inclusive[1])):
+                        return
+                    yield val
+                leaf, i = leaf.next, 0
+
+    @property
+    def depth(self):
+        """Number of levels in the tree."""
+        depth, node = 1, self.root
+        while node.children is not None:
+            depth += 1
+            node = node.children[0]
+        return depth
+
+    def _find_leaf(self, val):
+        """Return leaf val belongs in and path of (node, child index)."""
+        path = []
+        node = self.root
+        while node.children is not None:
+            i = bisect_right(node.keys, val)
+            path.append((node, i))
+            node = node.children[i]
+        return node, path
+
+    def _furthest_leaf(self, side):
+        """Return leftmost (side=0) or rightmost (side=-1) leaf."""
+        node = self.root
+        while node.children is not None:
+            node = node.children[side]
+        return node
+
+    def _fill(self, parent, i):
+        """Borrow for or merge underfull child i of parent."""
+        node = parent.children[i]
+        left = parent.children[i - 1] if i else None
+        right = parent.children[i + 1] if i + 1 < len(parent.children) else None
+        min_keys = self.fanout // 2
+        if left and len(left.keys) > min_keys:
+            node.take_from_left(left, parent, i - 1)
+        elif right and len(right.keys) > min_keys:
+            node.take_from_right(right, parent, i)
+        elif left:
+            left.merge(node, parent, i - 1)
+        else:
+            node.merge(right, parent, i)
+
+    def __len__(self):
+        """Return number of values in tree."""
+        return self._size
+
+    def __iter__(self):
+        """Iterate over values in order."""
+        return self.in_order()
+
+    def __contains__(self, val):
+        """Return whether val in tree."""
+        return self.contains(val)
+
+
+class BPlusNode(object):
+    """
+    Node of a BPlusTree.
+
+    Leaves have children set to None and are linked to their neighbors
+    through prev and next. Internal nodes have len(keys) + 1 children,
+    everything in children[i] being >= keys[i - 1] and < keys[i].
+    """
+
+    def __init__(self, keys=None, children=None):
+        """Set attributes on node object."""
+        self.keys = keys if keys is not None else []
+        self.children = children
+        self.prev = None
+        self.next = None
+
+    def split(self):
+        """Move upper half into a new right sibling, return (sep, sibling)."""
+        mid = len(self.keys) // 2
+        if self.children is None:
+            right = BPlusNode(self.keys[mid:])
+            sep = right.keys[0]
+            right.prev, right.next = self, self.next
+            if self.next:
+                self.next.prev = right
+            self.next = right
+        else:
+            right = BPlusNode(self.keys[mid + 1:], self.children[mid + 1:])
+            sep = self.keys[mid]
+            del self.children[mid + 1:]
+        del self.keys[mid:]
+        return sep, right
+
+    def take_from_left(self, left, parent, sep_i):
+        """Move last entry of left sibling into this node."""
+        if self.children is None:
+            self.keys.insert(0, left.keys.pop())
+            parent.keys[sep_i] = self.keys[0]
+        else:
+            self.keys.insert(0, parent.keys[sep_i])
+            parent.keys[sep_i] = left.keys.pop()
+            self.children.insert(0, left.children.pop())
+
+    def take_from_right(self, right, parent, sep_i):
+        """Move first entry of right sibling into this node."""
+        if self.children is None:
+            self.keys.append(right.keys.pop(0))
+            parent.keys[sep_i] = right.keys[0]
+        else:
+            self.keys.append(parent.keys[sep_i])
+            parent.keys[sep_i] = right.keys.pop(0)
+            self.children.append(right.children.pop(0))
+
+    def merge(self, right, parent, sep_i):
+        """Absorb right sibling and drop it from parent."""
+        if self.children is None:
+            self.next = right.next
+            if right.next:
+                right.next.prev = self
+        else:
+            self.keys.append(parent.keys[sep_i])
+            self.children.extend(right.children)
+        self.keys.extend(right.keys)
+        del parent.keys[sep_i]
+        del parent.children[sep_i + 1]
+
+
+class FrozenTree(object):
+    """
+    Read-only sorted set compiled from a BinaryTree.
+
+    Values are kept in one sorted list (or array, given a typecode) and
+    located with bisect, so lookups run as a C-level binary search with
+    no node hops or per-step comparisons in Python.
+    """
+
+    def __init__(self, sorted_vals=(), typecode=None):
+        """Store sorted, unique values."""
+        vals = unique_sorted(sorted_vals)
+        self.keys = array(typecode, vals) if typecode else vals
+
+    def search(self, val):
+        """Return index of val in keys if it exists, otherwise None."""
+        i = bisect_left(self.keys, val)
+        if i < len(self.keys) and self.keys[i] == val:
+            return i
+
+    def contains(self, val):
+        """Return whether val in tree."""
+        return self.search(val) is not None
+
+    def rank(self, val, inclusive=False):
+        """Return number of values less than (or equal to) val."""
+        return (bisect_right if inclusive else bisect_left)(self.keys, val)
+
+    def count_between(self, lo, hi, inclusive=(True, True)):
+        """Return number of values between lo and hi."""
+        start, stop = self._bounds(lo, hi, inclusive)
+        return max(stop - start, 0)
+
+    def irange(self, lo=None, hi=None, inclusive=(True, True), reverse=False):
+        """Return a generator of values between lo and hi, in order."""
+        start, stop = self._bounds(lo, hi, inclusive)
+        if reverse:
+            indices = range(stop - 1, start - 1, -1)
+        else:
+            indices = range(start, stop)
+        return map(self.keys.__getitem__, indices)
+
+    def in_order(self):
+        """Return a generator of the tree's values in order."""
+        return iter(self.keys)
+
+    def thaw(self, **kwargs):
+        """Return a balanced BinaryTree of the values in O(n)."""
+        return BinaryTree.from_sorted(self.keys, **kwargs)
+
+    def _bounds(self, lo, hi, inclusive):
+        """Return start and stop indices of values between lo and hi."""
+        start = 0 if lo is None else (
+            bisect_left if inclusive[0] else bisect_right)(self.keys, lo)
+        stop = len(self.keys) if hi is None else (
+            bisect_right if inclusive[1] else bisect_left)(self.keys, hi)
+        return start, stop
+
+    def __getitem__(self, k):
+        """Return kth smallest value, negative k counts from end."""
+        return self.keys[k]
+
+    def __len__(self):
+        """Return number of values."""
+        return len(self.keys)
+
+    def __iter__(self):
+        """Iterate over values in order."""
+        return self.in_order()
+
+    def __contains__(self, val):
+        """Return whether val in tree."""
+        return self.contains(val)
+
+
 def display_rows_from(root, num_rows, node_func, max_len=4, args=()):
     """Return printable tree."""
     width = shutil.get_terminal_size((96, 20)).columns
-    rows = [[root]]
-
-    for i in range(num_rows - 1):
-        rows.append(children_of(rows[i]))
-        if not any(rows[-1]):
-            break
-
     vals = []
-    for row in rows:
-        vals.append([node_func(node, *args) if node else '_' for node in row])
-
+    for level in level_order(root, num_rows, positions=True):
+        vals.append({pos: node_func(node, *args) for pos, node in level})
     return stringify_rows(vals, width, max_len)
 
 
@@ -471,7 +1923,7 @@ def display(binary_tree, num_rows=5, node_func=None, args=(), attrs=None):
 
 
 def stringify_rows(rows, width, max_len):
-    """Create tree string."""
+    """Create tree string from rows mapping positions to labels."""
     funcs = [math.floor, math.ceil]
     width += width % 2
     num_per = 1
@@ -481,7 +1933,7 @@ def stringify_rows(rows, width, max_len):
         each_gets = width / num_per
         split_len = (width - (max_len * num_per)) / (num_per * 2)
         for x in range(num_per):
-            rowstr += str(row[x]).center(max_len).join(' ' * funcs[x % 2](split_len) for x in range(2))
+            rowstr += str(row.get(x, '_')).center(max_len).join(' ' * funcs[x % 2](split_len) for x in range(2))
             each_currently_getting = len(rowstr) / (x + 1)
             if each_gets < each_currently_getting:
                 rowstr = rowstr[:-1]
@@ -493,14 +1945,38 @@ def stringify_rows(rows, width, max_len):
     return res
 
 
-def children_of(nodes):
-    """Return children of a list of nodes."""
+def level_order(root, max_depth=None, positions=False):
+    """
+    Yield levels of the subtree under root as lists of nodes, top down.
+
+    With positions=True, levels hold (position, node) pairs instead, the
+    position being the node's index among all 2 ** k slots of its level,
+    so missing nodes take no room.
+    """
+    level = [(0, root) if positions else root] if root else []
+    depth = 0
+    while level and depth != max_depth:
+        yield level
+        level = children_of(level, positions)
+        depth += 1
+
+
+def children_of(nodes, positions=False):
+    """Return the children of a level of nodes, as level_order yields it."""
     res = []
-    for node in nodes:
-        if node:
-            res += [node.left, node.right]
-        else:
-            res += [None, None]
+    append = res.append
+    if positions:
+        for pos, node in nodes:
+            if node.left:
+                append((2 * pos, node.left))
+            if node.right:
+                append((2 * pos + 1, node.right))
+    else:
+        for node in nodes:
+            if node.left:
+                append(node.left)
+            if node.right:
+                append(node.right)
     return res
 
 
@@ -520,23 +1996,427 @@ def getr(obj, toget):
     return res
 
 
-def treegen(iterable):
-    """Yield items from sorted iterable to build tree balanced."""
-    iterable = sorted(iterable)
-    if len(iterable) < 2:
-        for x in iterable:
-            yield x
+def unique_sorted(sorted_vals):
+    """Return list of sorted_vals with adjacent duplicates removed."""
+    res = []
+    for val in sorted_vals:
+        if not res or res[-1] != val:
+            res.append(val)
+    return res
+
+
+def _interval_end(node):
+    """Return end of the interval held by node."""
+    return node.val[1]
+
+
+def height(node):
+    """Return depth of node, 0 for None."""
+    return node.depth if node else 0
+
+
+def _refresh(node):
+    """Recompute depth, size and aggregate of node from its children."""
+    node.depth = 1 + max(height(node.left), height(node.right))
+    node.refresh_size()
+    if node.agg_spec:
+        node.refresh_agg()
+    return node
+
+
+def _attach(node, left, right):
+    """Make left and right the children of node, update node's fields."""
+    node.left = left
+    node.right = right
+    if left:
+        left.parent = node
+    if right:
+        right.parent = node
+    return _refresh(node)
+
+
+def _rotate_left(node):
+    """Rotate detached subtree left, return its new root."""
+    new_root = node.right
+    _attach(node, node.left, new_root.left)
+    return _attach(new_root, node, new_root.right)
+
+
+def _rotate_right(node):
+    """Rotate detached subtree right, return its new root."""
+    new_root = node.left
+    _attach(node, new_root.right, node.right)
+    return _attach(new_root, new_root.left, node)
+
+
+def _join_right(left, node, right):
+    """Join where left is taller: descend left's right spine."""
+    inner = left.right
+    if height(inner) <= height(right) + 1:
+        sub = _attach(node, inner, right)
+        if sub.depth <= height(left.left) + 1:
+            return _attach(left, left.left, sub)
+        return _rotate_left(_attach(left, left.left, _rotate_right(sub)))
+    sub = _join_right(inner, node, right)
+    res = _attach(left, left.left, sub)
+    if sub.depth <= height(left.left) + 1:
+        return res
+    return _rotate_left(res)
+
+
+def _join_left(left, node, right):
+    """Join where right is taller: descend right's left spine."""
+    inner = right.left
+    if height(inner) <= height(left) + 1:
+        sub = _attach(node, left, inner)
+        if sub.depth <= height(right.right) + 1:
+            return _attach(right, sub, right.right)
+        return _rotate_right(_attach(right, _rotate_left(sub), right.right))
+    sub = _join_left(left, node, inner)
+    res = _attach(right, sub, right.right)
+    if sub.depth <= height(right.right) + 1:
+        return res
+    return _rotate_right(res)
+
+
+def join_nodes(left, node, right):
+    """
+    Link AVL subtrees left and right under node and rebalance.
+
+    All values in left < node.val < all values in right. Return the
+    root of the joined subtree, which has no parent.
+    """
+    if height(left) > height(right) + 1:
+        root = _join_right(left, node, right)
+    elif height(right) > height(left) + 1:
+        root = _join_left(left, node, right)
     else:
-        h = len(iterable) // 2
-        l, m, r = treegen(iterable[:h]), iterable[h], treegen(iterable[h + 1:])
-        yield m
-        el, ri = True, True
-        while el or ri:
-            try:
-                yield next(l)
-            except:
-                el = False
-            try:
-                yield next(r)
-            except:
-                ri = False
+        root = _attach(node, left, right)
+    root.parent = None
+    return root
+
+
+def join2_nodes(left, right):
+    """Join two AVL subtrees without a middle node."""
+    if left is None:
+        if right:
+            right.parent = None
+        return right
+    rest, last = _split_last(left)
+    return join_nodes(rest, last, right)
+
+
+def _split_last(root):
+    """Detach node with largest value, return (rest of subtree, node)."""
+    if root.right is None:
+        rest = root.left
+        if rest:
+            rest.parent = None
+        return rest, _attach(root, None, None)
+    rest, last = _split_last(root.right)
+    return join_nodes(root.left, root, rest), last
+
+
+def split_nodes(root, val):
+    """
+    Split AVL subtree around val.
+
+    Return (left, node, right) where left holds values < val, right holds
+    values > val and node is the detached node holding val, or None.
+    """
+    if root is None:
+        return None, None, None
+    left, right = root.left, root.right
+    if val == root.val:
+        for child in (left, right):
+            if child:
+                child.parent = None
+        return left, _attach(root, None, None), right
+    if val < root.val:
+        less, mid, more = split_nodes(left, val)
+        return less, mid, join_nodes(more, root, right)
+    less, mid, more = split_nodes(right, val)
+    return join_nodes(left, root, less), mid, more
+
+
+def union_nodes(first, second):
+    """Return root of AVL subtree holding values of both subtrees."""
+    if first is None:
+        return second
+    if second is None:
+        return first
+    left, right = first.left, first.right
+    less, mid, more = split_nodes(second, first.val)
+    return join_nodes(union_nodes(left, less), first,
+                      union_nodes(right, more))
+
+
+def intersection_nodes(first, second):
+    """Return root of AVL subtree of first's values also in second."""
+    if first is None or second is None:
+        return None
+    left, right = first.left, first.right
+    less, mid, more = split_nodes(second, first.val)
+    less = intersection_nodes(left, less)
+    more = intersection_nodes(right, more)
+    if mid:
+        return join_nodes(less, first, more)
+    return join2_nodes(less, more)
+
+
+def difference_nodes(first, second):
+    """Return root of AVL subtree of first's values not in second."""
+    if first is None or second is None:
+        return first
+    left, right = second.left, second.right
+    less, mid, more = split_nodes(first, second.val)
+    return join2_nodes(difference_nodes(less, left),
+                       difference_nodes(more, right))
+
+
+def link_preorder(nodes, shape, parents=True):
+    """
+    Link nodes given in pre-order into the shape dump() recorded, in O(n).
+
+    shape[i] has bit 1 set if nodes[i] has a left child and bit 2 if it
+    has a right one. Depths, sizes and aggregates are then filled in
+    children first, walking the nodes backwards.
+    """
+    if not nodes:
+        return None
+    waiting = []
+    prev, prev_shape = nodes[0], shape[0]
+    for node, node_shape in zip(nodes[1:], shape[1:]):
+        if prev_shape & 1:
+            parent = prev
+            parent.left = node
+            if prev_shape & 2:
+                waiting.append(prev)
+        else:
+            if prev_shape & 2:
+                parent = prev
+            elif waiting:
+                parent = waiting.pop()
+            else:
+                raise ValueError('Corrupt tree shape.')
+            parent.right = node
+        if parents:
+            node.parent = parent
+        prev, prev_shape = node, node_shape
+    if waiting or prev_shape:
+        raise ValueError('Corrupt tree shape.')
+    for node in reversed(nodes):
+        _refresh(node)
+    return nodes[0]
+
+
+def link_nodes(nodes, lo, hi, parent=None, parents=True):
+    """
+    Relink existing nodes[lo:hi] (sorted) into a balanced subtree.
+
+    With parents=False the nodes' parent pointers are cleared instead.
+    """
+    if lo >= hi:
+        return None
+    mid = (lo + hi) // 2
+    node = nodes[mid]
+    node.parent = parent
+    above = node if parents else None
+    node.left = link_nodes(nodes, lo, mid, above, parents)
+    node.right = link_nodes(nodes, mid + 1, hi, above, parents)
+    node.depth = (hi - lo).bit_length()
+    node.size = hi - lo
+    if node.agg_spec:
+        node.refresh_agg()
+    return node
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import random
+    import timeit
+
+    def bench_bplus(sizes):
+        """Compare BinaryTree and BPlusTree builds, lookups and scans."""
+        for num in sizes:
+            vals = random.sample(range(num * 4), num)
+            probes = random.sample(vals, 10000)
+            print('\n{} keys:'.format(num))
+            for name, build in [
+                ('BinaryTree', lambda: BinaryTree(vals)),
+                ('BPlusTree(64)', lambda: BPlusTree(vals)),
+                ('BPlusTree(256)', lambda: BPlusTree(vals, fanout=256)),
+            ]:
+                start = timeit.default_timer()
+                tree = build()
+                built = timeit.default_timer() - start
+                search = timeit.timeit(
+                    lambda: [tree.contains(p) for p in probes], number=1)
+                scan = timeit.timeit(lambda: sum(tree.in_order()), number=1)
+                print('\t{:<16}build {:8.3f}s  10k searches {:7.4f}s  '
+                      'full scan {:7.3f}s'.format(name, built, search, scan))
+
+    def bench_freeze(sizes):
+        """Compare BinaryTree and FrozenTree lookups and range scans."""
+        for num in sizes:
+            vals = random.sample(range(num * 4), num)
+            probes = [random.randrange(num * 4) for _ in range(10000)]
+            tree = BinaryTree.from_sorted(sorted(vals))
+            print('\n{} keys:'.format(num))
+            for name, read in [
+                ('BinaryTree', tree),
+                ('FrozenTree', tree.freeze()),
+                ("FrozenTree('q')", tree.freeze(typecode='q')),
+            ]:
+                search = timeit.timeit(
+                    lambda: [read.contains(p) for p in probes], number=1)
+                scan = timeit.timeit(
+                    lambda: [sum(read.irange(p, p + 400)) for p in probes[:1000]],
+                    number=1)
+                print('\t{:<16}10k searches {:7.4f}s  1k range scans '
+                      '{:7.4f}s'.format(name, search, scan))
+
+    def bench_avl(sizes):
+        """Time inserts and deletes, report per-operation stats."""
+        for num in sizes:
+            vals = random.sample(range(num * 4), num)
+            tree = BinaryTree()
+            insert_time = timeit.timeit(
+                lambda: [tree.insert(v) for v in vals], number=1)
+            probes = random.sample(vals, min(num, 10000))
+            stats = []
+            tree.stats_hook = stats.append
+            for val in probes:
+                tree.delete(val)
+            for val in probes:
+                tree.insert(val)
+            tree.stats_hook = None
+            delete_time = timeit.timeit(
+                lambda: [tree.delete(v) for v in probes], number=1)
+            print('\n{} keys, depth {}:'.format(num, tree.root.depth))
+            print('\t{:.2f} us/insert, {:.2f} us/delete'.format(
+                insert_time / num * 1e6, delete_time / len(probes) * 1e6))
+            for op in ('insert', 'delete'):
+                ops = [st for st in stats if st.op == op]
+                print('\t{:<7} mean comparisons {:5.2f}  rotations {:4.2f}  '
+                      'depths recomputed {:4.2f}'.format(
+                          op,
+                          sum(st.comparisons for st in ops) / len(ops),
+                          sum(st.rotations for st in ops) / len(ops),
+                          sum(st.retraced for st in ops) / len(ops)))
+
+    def bench_interval(sizes):
+        """Compare IntervalTree overlap queries against a linear scan."""
+        for num in sizes:
+            intervals = []
+            for _ in range(num):
+                start = random.randrange(num * 10)
+                intervals.append((start, start + random.randrange(100)))
+            queries = []
+            for _ in range(100):
+                start = random.randrange(num * 10)
+                queries.append((start, start + 50))
+            start = timeit.default_timer()
+            tree = IntervalTree.from_sorted(intervals, presorted=False)
+            built = timeit.default_timer() - start
+            scan = timeit.timeit(lambda: [
+                [iv for iv in intervals if iv[0] <= hi and lo <= iv[1]]
+                for lo, hi in queries], number=1)
+            query = timeit.timeit(lambda: [
+                list(tree.overlapping(lo, hi)) for lo, hi in queries],
+                number=1)
+            print('\n{} intervals:'.format(num))
+            print('\tbuild {:.3f}s  100 queries: linear scan {:.4f}s  '
+                  'IntervalTree {:.4f}s'.format(built, scan, query))
+
+    def bench_balancer(sizes):
+        """Compare AVL and scapegoat balancing on mixed update traces."""
+        for num in sizes:
+            vals = random.sample(range(num * 4), num)
+            mixed = [(random.random() < 0.5, random.randrange(num * 4))
+                     for _ in range(num)]
+            print('\n{} keys, {} operations:'.format(num, num))
+            for balancer in ('avl', 'scapegoat'):
+                tree = BinaryTree.from_sorted(sorted(vals), balancer=balancer)
+
+                def run_mixed():
+                    for insert, val in mixed:
+                        if insert:
+                            tree.insert(val)
+                        else:
+                            tree.delete(val)
+
+                ttl = BinaryTree(balancer=balancer)
+
+                def run_ttl():
+                    window = num // 10
+                    for val in range(num):
+                        ttl.insert(val)
+                        if val >= window:
+                            ttl.delete(val - window)
+
+                mixed_time = timeit.timeit(run_mixed, number=1)
+                ttl_time = timeit.timeit(run_ttl, number=1)
+                print('\t{:<10} random insert/delete {:6.2f} us/op, depth {:2}'
+                      '   ttl window {:6.2f} us/op, depth {:2}, '
+                      '{} rotations, {} rebuilds'.format(
+                          balancer, mixed_time / num * 1e6, tree.root.depth,
+                          ttl_time / (2 * num) * 1e6, ttl.root.depth,
+                          tree.rotations + ttl.rotations,
+                          tree.rebuilds + ttl.rebuilds))
+
+    def bench_finger(sizes):
+        """Compare root and finger searches on lookups with locality."""
+        for num in sizes:
+            walk, pos = [], num // 2
+            for _ in range(100000):
+                pos = min(max(pos + random.randint(-8, 8), 0), num - 1)
+                walk.append(pos)
+            scattered = [random.randrange(num) for _ in range(100000)]
+            fresh = [v + 0.5 for v in sorted(random.sample(range(num), 10000))]
+            print('\n{} keys:'.format(num))
+            for finger in (False, True):
+                tree = BinaryTree(range(num), finger=finger)
+                local = timeit.timeit(
+                    lambda: [tree.search(v) for v in walk], number=1)
+                far = timeit.timeit(
+                    lambda: [tree.search(v) for v in scattered], number=1)
+                merge = timeit.timeit(
+                    lambda: [tree.insert(v) for v in fresh], number=1)
+                print('\tfinger={:<6}100k local searches {:6.3f}s  100k '
+                      'random searches {:6.3f}s  10k sorted inserts '
+                      '{:6.3f}s'.format(str(finger), local, far, merge))
+
+    def bench_dump(sizes):
+        """Compare dump/load against pickle."""
+        import io
+        for num in sizes:
+            tree = BinaryTree.from_sorted(range(num))
+            print('\n{} keys:'.format(num))
+            for name, save, restore in [
+                ('pickle', lambda f: pickle.dump(tree, f, -1), pickle.load),
+                ('dump', tree.dump, BinaryTree.load),
+                ("dump('q')", lambda f: tree.dump(f, 'q'), BinaryTree.load),
+            ]:
+                stream = io.BytesIO()
+                save_time = timeit.timeit(lambda: save(stream), number=1)
+                stream.seek(0)
+                load_time = timeit.timeit(lambda: restore(stream), number=1)
+                print('\t{:<10}{:8.1f} MB  save {:6.3f}s  load {:6.3f}s'.format(
+                    name, len(stream.getvalue()) / 2 ** 20, save_time,
+                    load_time))
+
+    benches = {
+        'avl': bench_avl,
+        'balancer': bench_balancer,
+        'bplus': bench_bplus,
+        'dump': bench_dump,
+        'finger': bench_finger,
+        'freeze': bench_freeze,
+        'interval': bench_interval,
+    }
+    if len(sys.argv) < 2 or sys.argv[1] not in benches:
+        print('usage: python -m data_structures.bst {} [sizes...]'.format(
+            '|'.join(sorted(benches))))
+        sys.exit(1)
+    sizes = [int(n) for n in sys.argv[2:]] or [10 ** 5, 10 ** 6]
+    benches[sys.argv[1]](sizes)
@@ -0,0 +1,268 @@
+"""Thread-safe AVL Binary Search Tree with reader-writer locking."""
+
+import threading
+from contextlib import contextmanager
+
+from data_structures.bst import BinaryTree
+
+
+class RWLock(object):
+    """
+    Lock letting any number of readers or a single writer in at a time.
+
+    Writers are preferred: once a writer is waiting, new readers wait
+    behind it, so a steady stream of reads can't starve writes.
+    """
+
+    def __init__(self):
+        """Initialize with no readers or writers."""
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        """Block until no writer holds or waits for the lock, then enter."""
+        with self._cond:
+            while self._writing or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        """Leave as a reader, waking writers if this was the last one."""
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        """Block until all readers and writers are out, then enter."""
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+
+    def release_write(self):
+        """Leave as the writer, waking everyone waiting."""
+        with self._cond:
+            self._writing = False
+            self._cond.notify_all()
+
+    @contextmanager
+    def reading(self):
+        """Context manager holding the lock shared."""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def writing(self):
+        """Context manager holding the lock exclusively."""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class ConcurrentBinaryTree(object):
+    """
+    BinaryTree safe to share between reader threads and writer threads.
+
+    Lookups run under a shared lock and don't wait for each other; writes
+    take it exclusively. The tree is persistent, so iteration runs over an
+    O(1) snapshot of the tree as it was when iteration began, without
+    holding any lock: writes that happen meanwhile copy the nodes they
+    change rather than modify ones the snapshot can see. One snapshot is
+    shared by all iterations until the next write.
+    """
+
+    def __init__(self, iterable=None, **kwargs):
+        """Initialize persistent tree, passing kwargs on to BinaryTree."""
+        self._tree = BinaryTree(iterable, persistent=True, **kwargs)
+        self._lock = RWLock()
+        self._snap = None
+        self._snap_lock = threading.Lock()
+
+    def snapshot(self):
+        """
+        Return a read-only BinaryTree of the current contents in O(1).
+
+        Taking a snapshot starts a new generation of the tree, so only
+        one reader at a time may take it, under _snap_lock; the rest
+        wait for it and share it.
+        """
+        snap = self._snap
+        if snap is None:
+            with self._snap_lock:
+                snap = self._snap
+                if snap is None:
+                    with self._lock.reading():
+                        snap = self._snap = self._tree.snapshot()
+        return snap
+
+    def _read(self, method, *args):
+        """Call tree method under the shared lock."""
+        lock = self._lock
+        lock.acquire_read()
+        try:
+            return getattr(self._tree, method)(*args)
+        finally:
+            lock.release_read()
+
+    def _write(self, method, *args):
+        """Call tree method under the exclusive lock."""
+        lock = self._lock
+        lock.acquire_write()
+        try:
+            self._snap = None
+            return getattr(self._tree, method)(*args)
+        finally:
+            lock.release_write()
+
+    @contextmanager
+    def batch(self):
+        """
+        Hold the exclusive lock for a block of writes, yielding the tree.
+
+        Readers see either none or all of the block's writes.
+        """
+        with self._lock.writing():
+            self._snap = None
+            yield self._tree
+
+    def insert(self, val):
+        """Insert val if not already present."""
+        self._write('insert', val)
+
+    def delete(self, val, error=False):
+        """Delete val if present, or raise ValueError if error is set."""
+        self._write('delete', val, error)
+
+    def update(self, iterable):
+        """Insert every value of iterable in one exclusive section."""
+        self._write('update', iterable)
+
+    def delete_many(self, iterable):
+        """Delete every value of iterable in one exclusive section."""
+        self._write('delete_many', iterable)
+
+    def contains(self, val):
+        """Return whether val in tree."""
+        return self._read('contains', val)
+
+    def floor(self, val):
+        """Return largest value <= val, None if there is none."""
+        node = self._read('floor', val)
+        return node and node.val
+
+    def ceiling(self, val):
+        """Return smallest value >= val, None if there is none."""
+        node = self._read('ceiling', val)
+        return node and node.val
+
+    def rank(self, val, inclusive=False):
+        """Return number of values less than (or equal to) val."""
+        return self._read('rank', val, inclusive)
+
+    def count_between(self, lo, hi, inclusive=(True, True)):
+        """Return number of values between lo and hi."""
+        return self._read('count_between', lo, hi, inclusive)
+
+    def irange(self, lo=None, hi=None, inclusive=(True, True), reverse=False):
+        """Return generator of values between lo and hi in a snapshot."""
+        return self.snapshot().irange(lo, hi, inclusive, reverse)
+
+    def in_order(self):
+        """Return generator of values in order in a snapshot."""
+        return self.snapshot().in_order()
+
+    def __getitem__(self, k):
+        """Return kth smallest value."""
+        return self._read('__getitem__', k)
+
+    def __len__(self):
+        """Return number of values in tree."""
+        return self._read('__len__')
+
+    def __iter__(self):
+        """Iterate over values of a snapshot in order."""
+        return self.in_order()
+
+    def __contains__(self, val):
+        """Return whether val in tree."""
+        return self.contains(val)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    import random
+    import sys
+    import timeit
+
+    class LockedBinaryTree(object):
+        """BinaryTree behind one global lock, as a baseline."""
+
+        def __init__(self, vals):
+            self._tree = BinaryTree(vals)
+            self._lock = threading.Lock()
+
+        def contains(self, val):
+            with self._lock:
+                return self._tree.contains(val)
+
+        def insert(self, val):
+            with self._lock:
+                self._tree.insert(val)
+
+        def delete(self, val):
+            with self._lock:
+                self._tree.delete(val)
+
+        def scan(self):
+            with self._lock:
+                return sum(self._tree.in_order())
+
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    vals = random.sample(range(num * 4), num)
+    reads, writes = 20000, 5000
+
+    def run(tree, scan):
+        done = []
+
+        def reader():
+            probes = [random.randrange(num * 4) for _ in range(reads)]
+            for i, probe in enumerate(probes):
+                tree.contains(probe)
+                if not i % 5000:
+                    scan()
+            done.append(reads)
+
+        def writer():
+            for _ in range(writes):
+                tree.insert(random.randrange(num * 4))
+                tree.delete(random.randrange(num * 4))
+            done.append(writes * 2)
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads.append(threading.Thread(target=writer))
+        start = timeit.default_timer()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sum(done) / (timeit.default_timer() - start)
+
+    locked = LockedBinaryTree(vals)
+    concurrent = ConcurrentBinaryTree(vals)
+    print('\n{} keys, {} reader threads, 1 writer thread:'.format(
+        num, readers))
+    for name, tree, scan in [
+        ('global lock', locked, locked.scan),
+        ('ConcurrentBinaryTree', concurrent, lambda: sum(concurrent)),
+    ]:
+        print('\t{:<22}{:>10.0f} ops/s'.format(name, run(tree, scan)))
@@ -1,16 +1,31 @@
 """Module with implementation of Weighted Graph."""
 
 import sys
-from collections import defaultdict
-from data_structures import Queue, BinaryHeap
+from array import array
+from collections import defaultdict, deque
+from heapq import heappop, heappush
+from itertools import count
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
 
 
 class Graph(object):
     """Graph data structure."""
 
-    def __init__(self):
-        """Initialize graph."""
+    def __init__(self, reverse_index=False):
+        """
+        Initialize graph.
+
+        With reverse_index, also keep in_dict, mapping each node to a dict
+        of the nodes with edges into it and their weights. It costs a
+        second dict entry per edge, and makes del_node O(degree) instead
+        of O(V) and predecessors / in_degree O(1).
+        """
         self.node_dict = {}
+        self.in_dict = {} if reverse_index else None
 
     def nodes(self):
         """Return a list of all nodes in the graph."""
@@ -27,6 +42,8 @@ class Graph(object):
     def add_node(self, n):
         """Add node n to the graph."""
         self.node_dict.setdefault(n, {})
+        if self.in_dict is not None:
+            self.in_dict.setdefault(n, {})
 
     def add_edge(self, n1, n2, weight=0):
         """
@@ -39,18 +56,24 @@ class Graph(object):
         if n2 in self.node_dict[n1]:
             raise ValueError("Edge already exists")
         self.node_dict[n1][n2] = weight
+        if self.in_dict is not None:
+            self.in_dict[n2][n1] = weight
 
     def del_node(self, n):
         """Delete node n from the graph. Raise error if no such node exists."""
-        if n in self.node_dict:
-            del self.node_dict[n]
-            for node in self.node_dict:
-                try:
-                    self.del_edge(node, n)
-                except:
-                    pass
-        else:
+        if n not in self.node_dict:
             raise KeyError("Cannot remove node that does not exist.")
+        out_edges = self.node_dict.pop(n)
+        if self.in_dict is None:
+            for edges in self.node_dict.values():
+                edges.pop(n, None)
+            return
+        for node in self.in_dict.pop(n):
+            if node != n:
+                del self.node_dict[node][n]
+        for node in out_edges:
+            if node != n:
+                del self.in_dict[node][n]
 
     def del_edge(self, n1, n2):
         """Delete edge from n1 to n2. Raise error if no such edge exists."""
@@ -58,6 +81,34 @@ class Graph(object):
             del self.node_dict[n1][n2]
         except KeyError:
             raise KeyError("Cannot remove edge that does not exist.")
+        if self.in_dict is not None:
+            del self.in_dict[n2][n1]
+
+    def _index_edges(self):
+        """Rebuild in_dict from node_dict."""
+        self.in_dict = {node: {} for node in self.node_dict}
+        for n1, edges in self.node_dict.items():
+            for n2, weight in edges.items():
+                self.in_dict[n2][n1] = weight
+
+    def predecessors(self, n):
+        """
+        Return the list of all nodes with an edge to node n.
+
+        Raise error if n is not present. Scans every edge unless the
+        graph keeps a reverse index.
+        """
+        if n not in self.node_dict:
+            raise KeyError("Cannot return predecessors of node that does not exist.")
+        if self.in_dict is not None:
+            return list(self.in_dict[n])
+        return [node for node, edges in self.node_dict.items() if n in edges]
+
+    def in_degree(self, n):
+        """Return number of edges into node n. Raise error if n is not present."""
+        if self.in_dict is not None and n in self.in_dict:
+            return len(self.in_dict[n])
+        return len(self.predecessors(n))
 
     def has_node(self, n):
         """Return whether node n is in graph."""
@@ -95,18 +146,7 @@ class Graph(object):
 
     def depth_first_traversal(self, start):
         """Traverse graph depth first."""
-        if start not in self.node_dict:
-            raise KeyError(str(start) + ' not in graph')
-
-        def depth_recurse(from_, visited):
-            res = [from_]
-            visited.add(from_)
-            for node in list(self.node_dict[from_]), len(self.node_dict[from_]):
-                if node not in visited:
-                    res += depth_recurse(node, visited)
-            return res
-
-        return depth_recurse(start, set())
+        return list(self.iter_depth_first(start))
 
     def depth_first_traversal_iterative(self, start):
         """Iteratively traverse graph depth first."""
@@ -118,67 +158,308 @@ class Graph(object):
             if cur_node not in visited:
                 res.append(cur_node)
                 visited.add(cur_node)
-                for node in self.node_dict[cur_node]:
+                for node in reversed(list(self.node_dict[cur_node])):
                     if node not in visited:
                         stack.append(node)
         return res
 
     def breadth_first_traversal(self, start):
         """Iteratively traverse graph breadth first."""
+        return list(self.iter_breadth_first(start))
+
+    def iter_depth_first(self, start, max_depth=None, predicate=None,
+                         edge_filter=None):
+        """
+        Return generator of nodes reachable from start, depth first.
+
+        Nodes come in the order a recursive traversal visits them, but
+        the path is kept on a list of edge iterators, so long paths don't
+        hit the recursion limit. With max_depth, a node reached again by
+        a shorter path is explored again from there, so every node within
+        max_depth edges is found.
+
+        max_depth: don't follow paths of more than max_depth edges
+        predicate: stop after yielding a node for which predicate(node)
+        edge_filter: only follow edges for which edge_filter(n1, n2, weight)
+        """
         if start not in self.node_dict:
             raise KeyError(str(start) + ' not in graph')
-        res, queue, visited = [], Queue([start]), {start}
-        while queue.head:
-            cur_node = queue.dequeue()
-            res.append(cur_node)
-            for node in self.node_dict[cur_node]:
-                if node not in visited:
-                    visited.add(node)
-                    queue.enqueue(node)
-        return res
+        return self._depth_first(start, max_depth, predicate, edge_filter)
+
+    def _depth_first(self, start, max_depth, predicate, edge_filter):
+        """Generate nodes for iter_depth_first."""
+        node_dict = self.node_dict
+        depths = {start: 0}
+        yield start
+        if (predicate and predicate(start)) or max_depth == 0:
+            return
+        stack = [(start, iter(node_dict[start].items()))]
+        while stack:
+            node, edges = stack[-1]
+            depth = len(stack)
+            for neighbor, weight in edges:
+                if edge_filter and not edge_filter(node, neighbor, weight):
+                    continue
+                if neighbor in depths:
+                    if max_depth is None or depths[neighbor] <= depth:
+                        continue
+                    depths[neighbor] = depth
+                else:
+                    depths[neighbor] = depth
+                    yield neighbor
+                    if predicate and predicate(neighbor):
+                        return
+                if max_depth is None or depth < max_depth:
+                    stack.append((neighbor, iter(node_dict[neighbor].items())))
+                    break
+            else:
+                stack.pop()
+
+    def iter_breadth_first(self, start, max_depth=None, predicate=None,
+                           edge_filter=None):
+        """
+        Return generator of nodes reachable from start, breadth first.
+
+        Nodes are yielded as soon as they are discovered, so stopping
+        early leaves the rest of the graph untouched.
+
+        max_depth: don't yield nodes more than max_depth edges from start
+        predicate: stop after yielding a node for which predicate(node)
+        edge_filter: only follow edges for which edge_filter(n1, n2, weight)
+        """
+        if start not in self.node_dict:
+            raise KeyError(str(start) + ' not in graph')
+        return self._breadth_first(start, max_depth, predicate, edge_filter)
+
+    def _breadth_first(self, start, max_depth, predicate, edge_filter):
+        """Generate nodes for iter_breadth_first."""
+        node_dict = self.node_dict
+        visited = {start}
+        yield start
+        if (predicate and predicate(start)) or max_depth == 0:
+            return
+        queue = deque([(start, 0)])
+        while queue:
+            node, depth = queue.popleft()
+            depth += 1
+            for neighbor, weight in node_dict[node].items():
+                if neighbor in visited or (
+                        edge_filter and not edge_filter(node, neighbor, weight)):
+                    continue
+                visited.add(neighbor)
+                yield neighbor
+                if predicate and predicate(neighbor):
+                    return
+                if max_depth is None or depth < max_depth:
+                    queue.append((neighbor, depth))
+
+    def has_path(self, start, end, edge_filter=None):
+        """Return whether end is reachable from start, searching only until found."""
+        if end not in self.node_dict:
+            raise KeyError(str(end) + ' not in graph')
+        for node in self.iter_breadth_first(start, edge_filter=edge_filter):
+            if node == end:
+                return True
+        return False
+
+    def shortest_paths(self, start, end=None):
+        """
+        Find shortest distances from start via Dijkstra's algorithm.
+
+        Returns: distance, predecessor dicts of every node reachable from
+        start (or, with end given, of the nodes settled before end).
+        predecessor[start] is None; see dijkstra_path for paths.
+
+        heapq entries carry a tie-breaking counter so nodes are never
+        compared, and a node is only pushed again when its distance
+        improves; outdated entries are skipped when popped.
+        """
+        if start not in self.node_dict:
+            raise KeyError(str(start) + ' not in graph')
+        node_dict = self.node_dict
+        distance, predecessor, best = {}, {}, {start: 0}
+        tiebreak = count()
+        heap = [(0, next(tiebreak), start, None)]
+        while heap:
+            curdist, _, node, parent = heappop(heap)
+            if node in distance:
+                continue
+            distance[node] = curdist
+            predecessor[node] = parent
+            if node == end:
+                break
+            for neighbor, weight in node_dict[node].items():
+                newdist = curdist + weight
+                if neighbor not in distance and (
+                        neighbor not in best or newdist < best[neighbor]):
+                    best[neighbor] = newdist
+                    heappush(heap, (newdist, next(tiebreak), neighbor, node))
+        return distance, predecessor
+
+    def dijkstra_path(self, predecessor, end):
+        """Return path to end from a shortest_paths predecessor dict."""
+        if end not in predecessor:
+            return []
+        path = [end]
+        node = predecessor[end]
+        while node is not None:
+            path.append(node)
+            node = predecessor[node]
+        path.reverse()
+        return path
 
     def dijkstra(self, start, end):
         """
         Find shortest path between start and end via Dijkstra's algorithm.
-        I use my own heap, with heapq, it's about 10 times faster...
 
-        Returns: path, distance
+        Stops as soon as end is settled.
+
+        Returns: distance, path (None, [] if end is unreachable)
         """
-        heap, visited = BinaryHeap([(0, start, [])]), set()
+        distance, predecessor = self.shortest_paths(start, end)
+        if end not in distance:
+            return None, []
+        return distance[end], self.dijkstra_path(predecessor, end)
+
+    def astar(self, start, end, heuristic=None):
+        """
+        Find shortest path between start and end via A* search.
+
+        heuristic(node, end) estimates the distance from node to end. It
+        must never overestimate it (nor, for a node, exceed an edge's
+        weight plus its estimate for the edge's target) for the path to
+        be shortest. Without one A* settles nodes like dijkstra.
+
+        Returns: distance, path (None, [] if end is unreachable)
+        """
+        return self._astar(start, end, heuristic)[:2]
+
+    def _astar(self, start, end, heuristic):
+        """Return distance, path and number of nodes settled by astar."""
+        for node in (start, end):
+            if node not in self.node_dict:
+                raise KeyError(str(node) + ' not in graph')
+        heuristic = heuristic or (lambda node, end: 0)
+        node_dict = self.node_dict
+        distance, predecessor, settled = {start: 0}, {start: None}, set()
+        tiebreak = count()
+        heap = [(heuristic(start, end), next(tiebreak), start)]
         while heap:
-            curdist, node, path = heap.pop()
-            path = path + [node]
+            node = heappop(heap)[2]
+            if node in settled:
+                continue
+            settled.add(node)
             if node == end:
+                return (distance[end], self.dijkstra_path(predecessor, end),
+                        len(settled))
+            curdist = distance[node]
+            for neighbor, weight in node_dict[node].items():
+                newdist = curdist + weight
+                if neighbor not in settled and (
+                        neighbor not in distance or newdist < distance[neighbor]):
+                    distance[neighbor] = newdist
+                    predecessor[neighbor] = node
+                    heappush(heap, (newdist + heuristic(neighbor, end),
+                                    next(tiebreak), neighbor))
+        return None, [], len(settled)
+
+    def bidirectional_dijkstra(self, start, end):
+        """
+        Find shortest path between start and end via bidirectional Dijkstra.
+
+        Searches forward from start and backward from end along incoming
+        edges, always advancing the side with the closer frontier, until
+        the two frontiers together can't beat the best path through an
+        edge between them. Uses in_dict on a reverse indexed graph and
+        otherwise builds the incoming edges for each call.
+
+        Returns: distance, path (None, [] if end is unreachable)
+        """
+        return self._bidirectional_dijkstra(start, end)[:2]
+
+    def _bidirectional_dijkstra(self, start, end):
+        """Return distance, path and number of nodes settled by the search."""
+        for node in (start, end):
+            if node not in self.node_dict:
+                raise KeyError(str(node) + ' not in graph')
+        if start == end:
+            return 0, [start], 1
+        reverse = self.in_dict
+        if reverse is None:
+            reverse = defaultdict(dict)
+            for n1, edges in self.node_dict.items():
+                for n2, weight in edges.items():
+                    reverse[n2][n1] = weight
+        adjacency = (self.node_dict, reverse)
+        distance = ({start: 0}, {end: 0})
+        predecessor = ({start: None}, {end: None})
+        settled = (set(), set())
+        tiebreak = count()
+        heaps = ([(0, next(tiebreak), start)], [(0, next(tiebreak), end)])
+        best, meet = float('inf'), None
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
                 break
-            if node not in visited:
-                visited.add(node)
-                for neighbor, weight in self.neighbors(node).items():
-                    heap.push((curdist + weight, neighbor, path))
-        else:
-            return [], None
-        return curdist, path
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            curdist, _, node = heappop(heaps[side])
+            if node in settled[side]:
+                continue
+            settled[side].add(node)
+            dist, other = distance[side], distance[1 - side]
+            for neighbor, weight in adjacency[side].get(node, {}).items():
+                newdist = curdist + weight
+                if neighbor not in settled[side] and (
+                        neighbor not in dist or newdist < dist[neighbor]):
+                    dist[neighbor] = newdist
+                    predecessor[side][neighbor] = node
+                    heappush(heaps[side], (newdist, next(tiebreak), neighbor))
+                if neighbor in other and newdist + other[neighbor] < best:
+                    best = newdist + other[neighbor]
+                    meet = (node, neighbor) if side == 0 else (neighbor, node)
+        num_settled = len(settled[0]) + len(settled[1])
+        if meet is None:
+            return None, [], num_settled
+        path = self.dijkstra_path(predecessor[0], meet[0])
+        node = meet[1]
+        while node is not None:
+            path.append(node)
+            node = predecessor[1][node]
+        return best, path, num_settled
 
     def floyd_warshall(self):
-        """Find all shortest paths and distances via floyd-warshall alg."""
+        """
+        Find all shortest paths and distances via floyd-warshall alg.
+
+        Returns: path_dict, distance dicts of dicts where path_dict[i][j]
+        is the node after i on the way to j (None if there is no path).
+        For graphs beyond a few hundred nodes see floyd_warshall_matrix.
+        """
+        inf = float('inf')
+        nodes = self.nodes()
         distance = {}
         path_dict = {}
-        for from_node in self.nodes():
-            distance[from_node] = {}
-            path_dict[from_node] = {}
-            for node in self.nodes():
-                distance[from_node][node] = float('inf')
-                path_dict[from_node][node] = None
-            distance[from_node][from_node] = 0
-            neighbors = self.neighbors(from_node)
-            for neighbor in neighbors:
-                distance[from_node][neighbor] = neighbors[neighbor]
-                path_dict[from_node][neighbor] = neighbor
-        for k in self.nodes():
-            for i in self.nodes():
-                for j in self.nodes():
-                    if distance[i][k] + distance[k][j] < distance[i][j]:
-                        distance[i][j] = distance[i][k] + distance[k][j]
-                        path_dict[i][j] = path_dict[i][k]
+        for from_node in nodes:
+            dist_row = distance[from_node] = dict.fromkeys(nodes, inf)
+            path_row = path_dict[from_node] = dict.fromkeys(nodes)
+            for neighbor, weight in self.node_dict[from_node].items():
+                dist_row[neighbor] = weight
+                path_row[neighbor] = neighbor
+            if not dist_row[from_node] < 0:
+                dist_row[from_node] = 0
+                path_row[from_node] = None
+        for k in nodes:
+            dist_k = distance[k]
+            for i in nodes:
+                dist_i = distance[i]
+                dist_ik = dist_i[k]
+                if dist_ik == inf:
+                    continue
+                path_i = path_dict[i]
+                hop = path_i[k]
+                for j, dist_kj in dist_k.items():
+                    if dist_ik + dist_kj < dist_i[j]:
+                        dist_i[j] = dist_ik + dist_kj
+                        path_i[j] = hop
         return path_dict, distance
 
     def floyd_warshall_path(self, path_dict, start, end):
@@ -191,10 +472,67 @@ class Graph(object):
             path.append(start)
         return path
 
+    def floyd_warshall_matrix(self):
+        """
+        Find all shortest distances via floyd-warshall on numpy arrays.
+
+        Returns: nodes, distance, next_hop where nodes lists the graph's
+        nodes in index order, distance is a float64 matrix (inf if there is
+        no path) and next_hop[i, j] is the index of the node after i on the
+        way to j, -1 if there is none. See floyd_warshall_matrix_path.
+
+        Each of the n rounds is one vectorized outer sum instead of n ** 2
+        python steps. Raises ImportError if numpy is not installed.
+        """
+        if np is None:
+            raise ImportError('floyd_warshall_matrix requires numpy')
+        nodes = self.nodes()
+        index = {node: i for i, node in enumerate(nodes)}
+        size = len(nodes)
+        distance = np.full((size, size), np.inf)
+        next_hop = np.full((size, size), -1, dtype=np.intp)
+        for i, from_node in enumerate(nodes):
+            for neighbor, weight in self.node_dict[from_node].items():
+                j = index[neighbor]
+                distance[i, j] = weight
+                next_hop[i, j] = j
+        diagonal = np.arange(size)
+        loops = ~(distance[diagonal, diagonal] < 0)
+        distance[diagonal[loops], diagonal[loops]] = 0
+        next_hop[diagonal[loops], diagonal[loops]] = -1
+        through = np.empty_like(distance)
+        shorter = np.empty((size, size), dtype=bool)
+        for k in range(size):
+            np.add(distance[:, k, None], distance[k], out=through)
+            np.less(through, distance, out=shorter)
+            np.minimum(distance, through, out=distance)
+            np.copyto(next_hop, next_hop[:, k, None], where=shorter)
+        return nodes, distance, next_hop
+
+    def floyd_warshall_matrix_path(self, nodes, next_hop, start, end):
+        """Return shortest path between start and end from floyd_warshall_matrix."""
+        i, j = nodes.index(start), nodes.index(end)
+        if next_hop[i, j] < 0:
+            return []
+        path = [start]
+        while i != j:
+            i = next_hop[i, j]
+            path.append(nodes[i])
+        return path
+
+    def freeze(self, typecode='d'):
+        """
+        Return a read-only CSRGraph of the graph for fast traversal.
+
+        Weights are packed in an array of typecode ('d' by default, 'q'
+        for integer weights).
+        """
+        return CSRGraph(self.node_dict, typecode=typecode)
+
     @classmethod
-    def from_dict(cls, gdict):
+    def from_dict(cls, gdict, **kwargs):
         from itertools import chain, repeat
-        inst = cls()
+        inst = cls(**kwargs)
         try:
             for fr, (to, w) in chain(*(zip(repeat(k), v.items()) for k, v in gdict.items())):
                 inst.add_edge(fr, to, w)
@@ -204,6 +542,169 @@ class Graph(object):
         return inst
 
 
+class CSRGraph(object):
+    """
+    Read-only weighted graph compiled from a Graph into flat arrays.
+
+    Nodes are numbered 0 to n - 1 in the order of labels (ids maps a label
+    back to its id). The edges out of node i are indices[indptr[i]:
+    indptr[i + 1]], with their weights at the same positions in weights,
+    so traversals work on ints and array slices rather than per-edge dict
+    lookups, and each edge costs 16 bytes instead of a dict entry. The
+    arrays support the buffer protocol, e.g. numpy.frombuffer(indices).
+    """
+
+    def __init__(self, node_dict, typecode='d'):
+        """Number nodes and pack edges of a Graph node_dict."""
+        self.labels = list(node_dict)
+        self.ids = {label: i for i, label in enumerate(self.labels)}
+        self.indptr = array('q', [0])
+        self.indices = array('q')
+        self.weights = array(typecode)
+        for label in self.labels:
+            edges = node_dict[label]
+            self.indices.extend(map(self.ids.__getitem__, edges))
+            self.weights.extend(edges.values())
+            self.indptr.append(len(self.indices))
+        self._in_degree = None
+
+    def _check(self, node):
+        """Raise KeyError if node is not an id in the graph."""
+        if not 0 <= node < len(self.labels):
+            raise KeyError(str(node) + ' not in graph')
+
+    def neighbors(self, node):
+        """Return array of ids of nodes that node has edges to."""
+        self._check(node)
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def edges_from(self, node):
+        """Return list of (neighbor id, weight) of edges out of node."""
+        self._check(node)
+        lo, hi = self.indptr[node], self.indptr[node + 1]
+        return list(zip(self.indices[lo:hi], self.weights[lo:hi]))
+
+    def out_degree(self, node):
+        """Return number of edges out of node."""
+        self._check(node)
+        return self.indptr[node + 1] - self.indptr[node]
+
+    def in_degree(self, node):
+        """Return number of edges into node, counting all nodes' once."""
+        self._check(node)
+        if self._in_degree is None:
+            degrees = array('q', bytes(8 * len(self.labels)))
+            for neighbor in self.indices:
+                degrees[neighbor] += 1
+            self._in_degree = degrees
+        return self._in_degree[node]
+
+    def depth_first(self, start):
+        """Return list of ids reached from start depth first."""
+        self._check(start)
+        indptr, indices = self.indptr, self.indices
+        res, stack, visited = [], [start], bytearray(len(self.labels))
+        while stack:
+            node = stack.pop()
+            if not visited[node]:
+                res.append(node)
+                visited[node] = 1
+                stack.extend(reversed(indices[indptr[node]:indptr[node + 1]]))
+        return res
+
+    def breadth_first(self, start):
+        """Return list of ids reached from start breadth first."""
+        self._check(start)
+        indptr, indices = self.indptr, self.indices
+        res, visited = [start], bytearray(len(self.labels))
+        visited[start] = 1
+        for node in res:
+            for neighbor in indices[indptr[node]:indptr[node + 1]]:
+                if not visited[neighbor]:
+                    visited[neighbor] = 1
+                    res.append(neighbor)
+        return res
+
+    def shortest_paths(self, start, end=None):
+        """
+        Find shortest distances from start via Dijkstra's algorithm.
+
+        Returns: distance, predecessor lists indexed by id, with inf and
+        -1 for nodes not reached (or, with end given, not settled before
+        end). predecessor[start] is start.
+        """
+        self._check(start)
+        if end is not None:
+            self._check(end)
+        indptr, indices, weights = self.indptr, self.indices, self.weights
+        size = len(self.labels)
+        distance = [float('inf')] * size
+        predecessor = [-1] * size
+        settled = bytearray(size)
+        distance[start] = 0
+        predecessor[start] = start
+        heap = [(0, start)]
+        while heap:
+            curdist, node = heappop(heap)
+            if settled[node]:
+                continue
+            settled[node] = 1
+            if node == end:
+                break
+            lo, hi = indptr[node], indptr[node + 1]
+            for neighbor, weight in zip(indices[lo:hi], weights[lo:hi]):
+                newdist = curdist + weight
+                if newdist < distance[neighbor] and not settled[neighbor]:
+                    distance[neighbor] = newdist
+                    predecessor[neighbor] = node
+                    heappush(heap, (newdist, neighbor))
+        for _, node in heap:
+            if not settled[node]:
+                distance[node] = float('inf')
+                predecessor[node] = -1
+        return distance, predecessor
+
+    def dijkstra_path(self, predecessor, end):
+        """Return ids on the path to end in a predecessor list, [] if none."""
+        self._check(end)
+        if predecessor[end] == -1:
+            return []
+        path = [end]
+        while predecessor[end] != end:
+            end = predecessor[end]
+            path.append(end)
+        path.reverse()
+        return path
+
+    def dijkstra(self, start, end):
+        """
+        Find shortest path between ids start and end via Dijkstra.
+
+        Returns: distance, path of ids (None, [] if end is unreachable)
+        """
+        distance, predecessor = self.shortest_paths(start, end)
+        if predecessor[end] == -1:
+            return None, []
+        return distance[end], self.dijkstra_path(predecessor, end)
+
+    def thaw(self, **kwargs):
+        """Return a Graph with the same labelled nodes and edges."""
+        graph = Graph(**kwargs)
+        labels, indptr = self.labels, self.indptr
+        for node, label in enumerate(labels):
+            lo, hi = indptr[node], indptr[node + 1]
+            graph.node_dict[label] = dict(zip(
+                map(labels.__getitem__, self.indices[lo:hi]),
+                self.weights[lo:hi]))
+        if graph.in_dict is not None:
+            graph._index_edges()
+        return graph
+
+    def __len__(self):
+        """Return number of nodes."""
+        return len(self.labels)
+
+
 if __name__ == '__main__':  # pragma: no cover
     import random
 
@@ -245,3 +746,131 @@ if __name__ == '__main__':  # pragma: no cover
               '\tPath: {}\n'.format(graph.depth_first_traversal_iterative(start)) +
               '\n1000 breadth first traversals:\n\t{} seconds\n'.format(breadth) +
               '\tPath: {}\n'.format(graph.breadth_first_traversal(start)))
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'floyd':
+        import timeit
+
+        for size in (100, 300, 1000):
+            dense = Graph()
+            for node in range(size):
+                dense.add_node(node)
+            for _ in range(size * 5):
+                n1, n2 = random.randrange(size), random.randrange(size)
+                if n2 not in dense.neighbors(n1):
+                    dense.add_edge(n1, n2, random.randint(1, 20))
+            print('\n{} nodes, {} edges:'.format(size, len(dense.edges())))
+            engines = [('floyd_warshall_matrix', dense.floyd_warshall_matrix)]
+            if size <= 300:
+                engines.insert(0, ('floyd_warshall', dense.floyd_warshall))
+            for name, engine in engines:
+                print('\t{:<24}{:.3f} seconds'.format(
+                    name, timeit.timeit(engine, number=1)))
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'csr':
+        import timeit
+        import tracemalloc
+
+        size = int(sys.argv[2]) if len(sys.argv) > 2 else 10 ** 5
+        tracemalloc.start()
+        big = Graph()
+        for node in range(size):
+            big.add_node(node)
+        for node in range(size):
+            for neighbor in random.sample(range(size), 10):
+                big.node_dict[node][neighbor] = random.randint(1, 100)
+        dict_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        build = timeit.default_timer()
+        csr = big.freeze(typecode='q')
+        build = timeit.default_timer() - build
+        csr_bytes = tracemalloc.get_traced_memory()[0] - dict_bytes
+        tracemalloc.stop()
+        print('\n{} nodes, {} edges: Graph {:.0f} MB, CSRGraph {:.0f} MB '
+              '(built in {:.2f} seconds)'.format(
+                  size, size * 10, dict_bytes / 2 ** 20, csr_bytes / 2 ** 20,
+                  build))
+        for name, slow, fast in [
+            ('breadth first', lambda: big.breadth_first_traversal(0),
+             lambda: csr.breadth_first(0)),
+            ('depth first', lambda: big.depth_first_traversal_iterative(0),
+             lambda: csr.depth_first(0)),
+            ('shortest paths', lambda: big.shortest_paths(0),
+             lambda: csr.shortest_paths(0)),
+        ]:
+            print('\t{:<16}Graph {:.3f} seconds, CSRGraph {:.3f} seconds'.format(
+                name, timeit.timeit(slow, number=1),
+                timeit.timeit(fast, number=1)))
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'churn':
+        import timeit
+
+        size = int(sys.argv[2]) if len(sys.argv) > 2 else 10 ** 4
+        print('\n{} nodes, 5 edges each, delete and re-add 2000 nodes:'.format(
+            size))
+        for reverse_index in (False, True):
+            churn = Graph(reverse_index=reverse_index)
+            for node in range(size):
+                for neighbor in random.sample(range(size), 5):
+                    churn.add_edge(node, neighbor, 1)
+
+            def run():
+                for node in random.sample(range(size), 2000):
+                    churn.del_node(node)
+                    for neighbor in random.sample(range(size), 5):
+                        churn.add_edge(node, neighbor, 1)
+
+            print('\treverse_index={!s:<6}{:.3f} seconds'.format(
+                reverse_index, timeit.timeit(run, number=1)))
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'reach':
+        import timeit
+
+        size = int(sys.argv[2]) if len(sys.argv) > 2 else 10 ** 5
+        sparse = Graph()
+        for node in range(size):
+            for neighbor in random.sample(range(size), 3):
+                sparse.add_edge(node, neighbor, 1)
+        near = list(sparse.iter_breadth_first(0, max_depth=2))[-1]
+        print('\n{} nodes, {} edges, target 2 edges away:'.format(
+            size, size * 3))
+        for name, query in [
+            ('end in breadth_first_traversal', lambda: near in
+             sparse.breadth_first_traversal(0)),
+            ('has_path', lambda: sparse.has_path(0, near)),
+        ]:
+            print('\t{:<32}{:.6f} seconds'.format(
+                name, timeit.timeit(query, number=1)))
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'route':
+        import timeit
+
+        side = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+        roads = Graph(reverse_index=True)
+        for x in range(side):
+            for y in range(side):
+                for nx, ny in ((x + 1, y), (x, y + 1), (x - 1, y), (x, y - 1)):
+                    if 0 <= nx < side and 0 <= ny < side:
+                        roads.add_edge((x, y), (nx, ny), random.randint(1, 9))
+
+        def manhattan(node, end):
+            return abs(node[0] - end[0]) + abs(node[1] - end[1])
+
+        def dijkstra(start, end):
+            distance, predecessor = roads.shortest_paths(start, end)
+            return (distance.get(end), roads.dijkstra_path(predecessor, end),
+                    len(distance))
+
+        queries = [random.sample(roads.nodes(), 2) for _ in range(50)]
+        print('\n{0}x{0} grid, {1} random point to point queries:'.format(
+            side, len(queries)))
+        for name, engine in [
+            ('dijkstra', dijkstra),
+            ('astar (manhattan)', lambda s, e: roads._astar(s, e, manhattan)),
+            ('bidirectional_dijkstra', roads._bidirectional_dijkstra),
+        ]:
+            settled = []
+            elapsed = timeit.timeit(lambda: settled.extend(
+                engine(s, e)[2] for s, e in queries), number=1)
+            print('\t{:<24}{:>8.0f} nodes settled, {:.2f} ms per query'.format(
+                name, sum(settled) / len(queries),
+                elapsed * 1000 / len(queries)))
@@ -0,0 +1,117 @@
+"""Tests for the array-backed AVL binary search tree."""
+
+import random
+
+import pytest
+
+from data_structures.array_bst import ArrayBinaryTree, NIL
+
+
+TEST_INSERTIONS = [
+    [],
+    [0],
+    [1, 0],
+    list(range(50)),
+    list(range(50, 0, -1)),
+] + [random.sample(range(-100, 100), random.randrange(60)) for i in range(20)]
+
+
+def assert_valid_avl(tree):
+    """Check ordering, parent links, heights and balance of tree columns."""
+    def check(node, parent):
+        if not node:
+            return 0, []
+        assert tree.parent[node] == parent
+        lheight, lvals = check(tree.left[node], node)
+        rheight, rvals = check(tree.right[node], node)
+        assert tree.height[node] == 1 + max(lheight, rheight)
+        assert abs(lheight - rheight) <= 1
+        return tree.height[node], lvals + [tree.keys[node]] + rvals
+
+    height, vals = check(tree.root, NIL)
+    assert vals == sorted(set(vals))
+    assert len(tree) == len(vals)
+
+
+@pytest.fixture(params=[None, 'q'])
+def typecode(request):
+    """Store keys in a list or in a typed array."""
+    return request.param
+
+
+@pytest.mark.parametrize('sequence', TEST_INSERTIONS)
+def test_insert_builds_valid_avl(sequence, typecode):
+    """Inserting keeps the tree a valid AVL with every value."""
+    tree = ArrayBinaryTree(sequence, typecode=typecode)
+    assert_valid_avl(tree)
+    assert list(tree.in_order()) == sorted(set(sequence))
+
+
+@pytest.mark.parametrize('sequence', TEST_INSERTIONS)
+def test_delete_keeps_valid_avl(sequence, typecode):
+    """Deleting keeps the tree a valid AVL without deleted values."""
+    tree = ArrayBinaryTree(sequence, typecode=typecode)
+    to_delete = random.sample(sequence, len(sequence) // 2)
+    for val in to_delete:
+        tree.delete(val)
+        assert not tree.contains(val)
+    assert_valid_avl(tree)
+    assert list(tree) == sorted(set(sequence) - set(to_delete))
+
+
+def test_delete_missing():
+    """Deleting a missing value is ignored unless error is set."""
+    tree = ArrayBinaryTree([1, 2, 3])
+    tree.delete(4)
+    assert len(tree) == 3
+    with pytest.raises(ValueError):
+        tree.delete(4, error=True)
+
+
+def test_freed_slots_are_reused():
+    """Inserts after deletes reuse freed slots instead of growing columns."""
+    tree = ArrayBinaryTree(range(100))
+    for val in range(0, 100, 2):
+        tree.delete(val)
+    for val in range(1000, 1050):
+        tree.insert(val)
+    assert len(tree.keys) == 101
+    assert_valid_avl(tree)
+
+
+def test_search_and_contains():
+    """search returns a node index holding the value, or None."""
+    tree = ArrayBinaryTree([5, 3, 8])
+    assert tree.keys[tree.search(8)] == 8
+    assert tree.search(4) is None
+    assert 3 in tree
+    assert 4 not in tree
+
+
+def test_traversals_match_recursive_definitions():
+    """Traversal orders match their recursive definitions."""
+    tree = ArrayBinaryTree(random.sample(range(100), 40))
+
+    def pre(node):
+        if not node:
+            return []
+        return [tree.keys[node]] + pre(tree.left[node]) + pre(tree.right[node])
+
+    def post(node):
+        if not node:
+            return []
+        return post(tree.left[node]) + post(tree.right[node]) + [tree.keys[node]]
+
+    assert list(tree.pre_order()) == pre(tree.root)
+    assert list(tree.post_order()) == post(tree.root)
+    bfs = list(tree.breadth_first(attr=None))
+    assert bfs[0] == tree.root
+    assert [tree.height[n] for n in tree.breadth_first(attr=None)] == \
+        list(tree.breadth_first(attr='depth'))
+    assert sorted(tree.keys[n] for n in bfs) == list(tree.in_order())
+
+
+def test_bad_attr_raises():
+    """Traversing with an unknown attr raises AttributeError."""
+    with pytest.raises(AttributeError):
+        list(ArrayBinaryTree([1]).in_order(attr='color'))
@@ -1,10 +1,12 @@
 """Test for binary search tree data structures."""
 
+import operator
 import pytest
 import random
 from collections import namedtuple
 
-from data_structures.bst import BinaryTree, BinaryTreeNode
+from data_structures.bst import (
+    BinaryTree, BinaryTreeNode, BPlusTree, FrozenTree, IntervalTree, TreeMap)
 
 """
 Tests:
@@ -422,3 +424,1117 @@ def binarytree(request):
 #             if value != node:
 #                 avl.delete(value)
 #                 assert abs(avl.balance(actual_node)) <= 1
+
+
+def assert_valid_avl(tree, parents=True):
+    """Check ordering, parent pointers, depths, balance and size of tree."""
+    def check(node, parent):
+        if node is None:
+            return 0, []
+        if parents:
+            assert node.parent is parent
+        ldepth, lvals = check(node.left, node)
+        rdepth, rvals = check(node.right, node)
+        assert node.depth == 1 + max(ldepth, rdepth)
+        assert abs(ldepth - rdepth) <= 1
+        assert node.size == 1 + len(lvals) + len(rvals)
+        return node.depth, lvals + [node.val] + rvals
+
+    depth, vals = check(tree.root, None)
+    assert vals == sorted(set(vals))
+    assert len(tree) == len(vals)
+
+
+@pytest.mark.parametrize('sequence', TEST_INSERTIONS)
+def test_traversals_match_recursive_definitions(sequence):
+    """Non-recursive traversals visit nodes in the textbook orders."""
+    tree = BinaryTree(sequence)
+
+    def pre(node):
+        return [node.val] + pre(node.left) + pre(node.right) if node else []
+
+    def post(node):
+        return post(node.left) + post(node.right) + [node.val] if node else []
+
+    assert list(tree.in_order()) == sorted(set(sequence))
+    assert list(tree.pre_order()) == pre(tree.root)
+    assert list(tree.post_order()) == post(tree.root)
+
+
+def test_traversal_of_degenerate_tree_is_not_recursive():
+    """Traversing a tree deeper than the recursion limit works."""
+    import sys
+    tree = BinaryTree(autobalance=False)
+    tree.root = node = BinaryTreeNode(0)
+    depth = sys.getrecursionlimit() + 10
+    for val in range(1, depth):
+        node.right = BinaryTreeNode(val, parent=node)
+        node = node.right
+    assert list(tree.in_order()) == list(range(depth))
+    assert list(tree.pre_order()) == list(range(depth))
+    assert list(tree.post_order()) == list(range(depth))[::-1]
+    assert list(tree.breadth_first()) == list(range(depth))
+    assert list(tree.levels(max_depth=3)) == [[0], [1], [2]]
+
+
+@pytest.mark.parametrize('sequence', TEST_INSERTIONS)
+def test_levels_group_nodes_by_depth(sequence):
+    """levels and breadth_first follow depth, left to right."""
+    tree = BinaryTree(sequence)
+    by_depth = {}
+
+    def walk(node, depth):
+        if node:
+            walk(node.left, depth + 1)
+            by_depth.setdefault(depth, []).append(node.val)
+            walk(node.right, depth + 1)
+
+    walk(tree.root, 0)
+    expected = [by_depth[d] for d in sorted(by_depth)]
+    assert list(tree.levels()) == expected
+    assert list(tree.breadth_first()) == sum(expected, [])
+    assert list(tree.levels(max_depth=2)) == expected[:2]
+    assert list(tree.breadth_first(max_depth=0)) == []
+    if tree.root and tree.root.right:
+        start = tree.root.right
+        assert list(tree.levels(start, attr=None))[0] == [start]
+
+
+def test_display_rows_skip_missing_subtrees():
+    """Rendering marks gaps with '_' and stops at the last level."""
+    from data_structures.bst import display_rows_from
+    tree = BinaryTree(autobalance=False)
+    for val in [4, 2, 6, 7]:
+        tree.insert(val)
+    rows = display_rows_from(tree.root, 10, lambda n: n.val).splitlines()
+    assert [row.split() for row in rows] == [
+        ['4'], ['2', '6'], ['_', '_', '_', '7']]
+    assert str(tree).splitlines() == rows
+
+
+@pytest.mark.parametrize('sequence', TEST_INSERTIONS)
+def test_cursor_walks_forward_and_back(sequence):
+    """Cursor next and prev visit every value in both directions."""
+    tree = BinaryTree(sequence)
+    ordered = sorted(set(sequence))
+    cur = tree.cursor()
+    assert list(cur) == ordered
+    backwards = []
+    while True:
+        try:
+            backwards.append(cur.prev())
+        except StopIteration:
+            break
+    assert backwards == ordered[::-1]
+    assert list(cur) == ordered
+
+
+def test_cursor_seek():
+    """Seek positions cursor at the ceiling of a value."""
+    tree = BinaryTree(TEST_BST2)
+    cur = tree.cursor()
+    assert cur.seek(12)
+    assert next(cur) == 12
+    assert not cur.seek(13)
+    assert next(cur) == 17
+    assert cur.prev() == 17
+    assert cur.prev() == 12
+    assert not cur.seek(50)
+    assert cur.node is None
+    assert cur.prev() == 49
+    assert list(tree.cursor(18)) == [19, 31, 43, 49]
+
+
+def test_cursor_resumes_scan():
+    """A paused cursor continues from where it stopped."""
+    tree = BinaryTree(range(20))
+    cur = tree.cursor(attr=None)
+    first = [next(cur).val for _ in range(5)]
+    assert first == list(range(5))
+    assert [node.val for node in cur] == list(range(5, 20))
+
+
+@pytest.mark.parametrize('sequence', TEST_INSERTIONS)
+def test_from_sorted_builds_valid_avl(sequence):
+    """from_sorted links a balanced tree with correct depths."""
+    tree = BinaryTree.from_sorted(sorted(sequence))
+    assert_valid_avl(tree)
+    assert list(tree.in_order()) == sorted(set(sequence))
+    assert tree.rotations == 0
+
+
+def test_from_sorted_unsorted_input():
+    """from_sorted with presorted=False sorts and drops duplicates."""
+    tree = BinaryTree.from_sorted([5, 1, 3, 3, 9, 1], presorted=False)
+    assert_valid_avl(tree)
+    assert list(tree.in_order()) == [1, 3, 5, 9]
+    tree.insert(4)
+    tree.delete(9)
+    assert_valid_avl(tree)
+
+
+def test_init_with_range_is_balanced():
+    """Initializing with a range links a balanced tree."""
+    tree = BinaryTree(range(100, 0, -3))
+    assert_valid_avl(tree)
+    assert list(tree.in_order()) == sorted(range(100, 0, -3))
+
+
+def test_sizes_maintained_through_inserts_and_deletes():
+    """Subtree sizes stay correct through rotations and deletions."""
+    values = random.sample(range(1000), 300)
+    tree = BinaryTree()
+    for val in values:
+        tree.insert(val)
+    assert_valid_avl(tree)
+    for val in values[:200]:
+        tree.delete(val)
+        assert tree.root.size == len(tree)
+    assert_valid_avl(tree)
+
+
+def test_rank_select_getitem():
+    """rank, select and indexing agree with the sorted values."""
+    values = random.sample(range(-500, 500), 200)
+    tree = BinaryTree(values)
+    ordered = sorted(values)
+    for i, val in enumerate(ordered):
+        assert tree.rank(val) == i
+        assert tree.rank(val, inclusive=True) == i + 1
+        assert tree.select(i).val == val
+        assert tree[i] == val
+    assert tree[-1] == ordered[-1]
+    assert tree.rank(1000) == len(ordered)
+    with pytest.raises(IndexError):
+        tree[len(ordered)]
+    with pytest.raises(IndexError):
+        BinaryTree()[0]
+
+
+@pytest.mark.parametrize('lo, hi, inclusive', [
+    (3, 11, (True, True)),
+    (3, 11, (False, True)),
+    (3, 11, (True, False)),
+    (3, 11, (False, False)),
+    (4, 4, (True, True)),
+    (10, 2, (True, True)),
+    (-5, 100, (True, True)),
+])
+def test_count_between(lo, hi, inclusive):
+    """count_between counts values in range with given bound types."""
+    tree = BinaryTree(TEST_BST1)
+    lo_ok = (lambda v: v >= lo) if inclusive[0] else (lambda v: v > lo)
+    hi_ok = (lambda v: v <= hi) if inclusive[1] else (lambda v: v < hi)
+    expected = len([v for v in TEST_BST1 if lo_ok(v) and hi_ok(v)])
+    assert tree.count_between(lo, hi, inclusive) == expected
+
+
+IRANGE_CASES = [
+    (None, None, (True, True)),
+    (3, 11, (True, True)),
+    (3, 11, (False, False)),
+    (4, 9, (False, True)),
+    (4, 9, (True, False)),
+    (None, 6, (True, False)),
+    (6, None, (False, True)),
+    (10, 2, (True, True)),
+    (100, None, (True, True)),
+]
+
+
+@pytest.mark.parametrize('lo, hi, inclusive', IRANGE_CASES)
+@pytest.mark.parametrize('reverse', [False, True])
+def test_irange(lo, hi, inclusive, reverse):
+    """irange yields exactly the values within bounds, in order."""
+    tree = BinaryTree(TEST_BST1)
+    expected = [
+        v for v in sorted(TEST_BST1)
+        if (lo is None or (v >= lo if inclusive[0] else v > lo)) and
+        (hi is None or (v <= hi if inclusive[1] else v < hi))
+    ]
+    if reverse:
+        expected.reverse()
+    assert list(tree.irange(lo, hi, inclusive, reverse)) == expected
+
+
+def test_irange_prunes_subtrees():
+    """irange only visits nodes on the paths to and within the range."""
+    tree = BinaryTree(range(1 << 12))
+    visited = []
+
+    class Spy(object):
+        def __init__(self, val):
+            self.val = val
+
+        def __ge__(self, other):
+            visited.append(other)
+            return self.val >= other
+
+        def __le__(self, other):
+            visited.append(other)
+            return self.val <= other
+
+    result = list(tree.irange(Spy(1000), Spy(1004)))
+    assert result == list(range(1000, 1005))
+    assert len(visited) < 4 * tree.root.depth + 10
+
+
+def test_neighbor_queries():
+    """floor, ceiling, predecessor and successor find closest nodes."""
+    tree = BinaryTree(TEST_BST2)
+    assert tree.floor(12).val == 12
+    assert tree.floor(13).val == 12
+    assert tree.floor(3) is None
+    assert tree.ceiling(12).val == 12
+    assert tree.ceiling(13).val == 17
+    assert tree.ceiling(50) is None
+    assert tree.predecessor(12).val == 11
+    assert tree.predecessor(4) is None
+    assert tree.successor(12).val == 17
+    assert tree.successor(49) is None
+    assert tree.successor(0).val == 4
+
+
+def random_tree(size, span=1000):
+    """Return tree of random values and the set of them."""
+    values = set(random.sample(range(span), size))
+    return BinaryTree(random.sample(sorted(values), len(values))), values
+
+
+@pytest.mark.parametrize('sizes', [(0, 0), (0, 10), (10, 0), (1, 1),
+                                   (3, 200), (200, 3), (100, 120)])
+def test_join(sizes):
+    """join links two trees and a middle value into a valid AVL."""
+    left = BinaryTree(random.sample(range(500), sizes[0]))
+    right = BinaryTree(random.sample(range(501, 1000), sizes[1]))
+    expected = list(left.in_order()) + [500] + list(right.in_order())
+    tree = BinaryTree.join(left, 500, right)
+    assert_valid_avl(tree)
+    assert list(tree.in_order()) == expected
+    assert len(left) == len(right) == 0
+
+
+def test_join_out_of_order_raises():
+    """join refuses values that would break ordering."""
+    with pytest.raises(ValueError):
+        BinaryTree.join(BinaryTree([1, 5]), 3, BinaryTree([7]))
+    with pytest.raises(ValueError):
+        BinaryTree.join(BinaryTree([1]), 3, BinaryTree([2, 7]))
+
+
+def test_treemap_join_stores_middle_item():
+    """TreeMap.join stores its middle item under its key, like insert."""
+    first = operator.itemgetter(0)
+    tmap = TreeMap.join(TreeMap([(1, 'a')], key=first), (2, 'b'),
+                        TreeMap([(3, 'c')], key=first))
+    assert list(tmap.items()) == [(1, (1, 'a')), (2, (2, 'b')), (3, (3, 'c'))]
+    assert tmap.key is first
+    plain = TreeMap.join(TreeMap([1]), 2, TreeMap([3]))
+    assert list(plain.items()) == [(1, 1), (2, 2), (3, 3)]
+    with pytest.raises(ValueError):
+        TreeMap.join(TreeMap([(1, 'a')], key=first), (0, 'z'),
+                     TreeMap(key=first))
+
+
+@pytest.mark.parametrize('size', [0, 1, 2, 50, 300])
+def test_split(size):
+    """split partitions a tree into valid AVL halves around a value."""
+    tree, values = random_tree(size)
+    for val in [-1, 500, 1000] + random.sample(sorted(values), min(size, 3)):
+        tree = BinaryTree(values)
+        left, found, right = tree.split(val)
+        assert_valid_avl(left)
+        assert_valid_avl(right)
+        assert found == (val in values)
+        assert list(left.in_order()) == sorted(v for v in values if v < val)
+        assert list(right.in_order()) == sorted(v for v in values if v > val)
+        assert len(tree) == 0
+
+
+SET_SIZES = [(0, 0), (0, 20), (20, 0), (1, 300), (300, 1), (5, 400),
+             (150, 150), (400, 40)]
+
+
+@pytest.mark.parametrize('sizes', SET_SIZES)
+def test_union(sizes):
+    """union merges other's values into tree."""
+    first, first_vals = random_tree(sizes[0])
+    second, second_vals = random_tree(sizes[1])
+    first.union(second)
+    assert_valid_avl(first)
+    assert list(first.in_order()) == sorted(first_vals | second_vals)
+    assert len(second) == 0
+
+
+@pytest.mark.parametrize('sizes', SET_SIZES)
+def test_intersection(sizes):
+    """intersection keeps only values in both trees."""
+    first, first_vals = random_tree(sizes[0])
+    second, second_vals = random_tree(sizes[1])
+    first.intersection(second)
+    assert_valid_avl(first)
+    assert list(first.in_order()) == sorted(first_vals & second_vals)
+
+
+@pytest.mark.parametrize('sizes', SET_SIZES)
+def test_difference(sizes):
+    """difference drops values found in other."""
+    first, first_vals = random_tree(sizes[0])
+    second, second_vals = random_tree(sizes[1])
+    first.difference(second)
+    assert_valid_avl(first)
+    assert list(first.in_order()) == sorted(first_vals - second_vals)
+
+
+def test_set_operations_with_self():
+    """Set operations with the tree itself behave like sets."""
+    tree = BinaryTree(range(10))
+    tree.union(tree)
+    tree.intersection(tree)
+    assert list(tree.in_order()) == list(range(10))
+    tree.difference(tree)
+    assert len(tree) == 0 and tree.root is None
+
+
+def test_persistent_tree_stays_balanced():
+    """Path-copying inserts and deletes keep a valid AVL tree."""
+    values = random.sample(range(1000), 300)
+    tree = BinaryTree(values, persistent=True)
+    assert_valid_avl(tree, parents=False)
+    for val in values[:200]:
+        tree.delete(val)
+    tree.delete(5000)
+    assert_valid_avl(tree, parents=False)
+    assert list(tree.in_order()) == sorted(values[200:])
+
+
+def test_snapshot_unaffected_by_writes():
+    """Snapshots keep their contents while the live tree changes."""
+    tree = BinaryTree(range(0, 100, 2), persistent=True)
+    snaps = []
+    expected = []
+    for i in range(20):
+        snaps.append(tree.snapshot())
+        expected.append(list(tree.in_order()))
+        tree.insert(random.randrange(100))
+        tree.delete(random.randrange(100))
+    for snap, values in zip(snaps, expected):
+        assert list(snap.in_order()) == values
+        assert len(snap) == len(values)
+        assert_valid_avl(snap, parents=False)
+    assert_valid_avl(tree, parents=False)
+
+
+def test_snapshot_shares_untouched_nodes():
+    """A write after a snapshot copies only the nodes it changes."""
+    tree = BinaryTree(range(1024), persistent=True)
+    snap = tree.snapshot()
+    tree.insert(2000)
+    old = set(map(id, snap.in_order(attr=None)))
+    new = set(map(id, tree.in_order(attr=None)))
+    assert len(new - old) <= 2 * tree.root.depth
+
+
+def test_persistent_bulk_builds_copy_only_shared_nodes():
+    """Bulk builds keep their own new nodes and only copy snapshot ones."""
+    tree = BinaryTree(range(1000), persistent=True)
+    nodes = list(tree.in_order(attr=None))
+    assert all(node.parent is None for node in nodes)
+    tree.update(range(1000, 2000))
+    new = list(tree.in_order(attr=None))
+    assert all(a is b for a, b in zip(nodes, new))
+    assert all(node.parent is None for node in new)
+    snap = tree.snapshot()
+    tree.update(range(2000, 3000))
+    old = set(map(id, snap.in_order(attr=None)))
+    assert len(old & set(map(id, tree.in_order(attr=None)))) == 0
+    assert list(snap.in_order()) == list(range(2000))
+    assert_valid_avl(tree, parents=False)
+
+
+def test_snapshot_is_read_only():
+    """Snapshots refuse writes, non-persistent trees refuse snapshots."""
+    snap = BinaryTree([1, 2, 3], persistent=True).snapshot()
+    with pytest.raises(TypeError):
+        snap.insert(4)
+    with pytest.raises(TypeError):
+        snap.delete(1)
+    with pytest.raises(TypeError):
+        BinaryTree([1]).snapshot()
+
+
+def assert_valid_bplus(tree):
+    """Check key order, node occupancy, leaf depth and leaf links."""
+    leaves = []
+
+    def check(node, lo, hi, level):
+        assert node.keys == sorted(node.keys)
+        assert all((lo is None or lo <= k) and (hi is None or k < hi)
+                   for k in node.keys)
+        if node is not tree.root:
+            assert tree.fanout // 2 <= len(node.keys) <= tree.fanout
+        if node.children is None:
+            leaves.append((node, level))
+            return
+        assert len(node.children) == len(node.keys) + 1
+        bounds = [lo] + node.keys + [hi]
+        for i, child in enumerate(node.children):
+            check(child, bounds[i], bounds[i + 1], level + 1)
+
+    check(tree.root, None, None, 1)
+    assert len(set(level for leaf, level in leaves)) == 1
+    for (leaf, _), (nxt, _) in zip(leaves, leaves[1:]):
+        assert leaf.next is nxt and nxt.prev is leaf
+    assert leaves[0][0].prev is None and leaves[-1][0].next is None
+    assert len(tree) == sum(len(leaf.keys) for leaf, _ in leaves)
+
+
+@pytest.mark.parametrize('fanout', [3, 4, 7, 64])
+@pytest.mark.parametrize('sequence', TEST_INSERTIONS[:10])
+def test_bplus_insert_and_delete(fanout, sequence):
+    """B+ tree stays valid and ordered through inserts and deletes."""
+    tree = BPlusTree(sequence, fanout=fanout)
+    assert_valid_bplus(tree)
+    assert list(tree.in_order()) == sorted(set(sequence))
+    to_delete = random.sample(list(sequence), len(sequence) // 2)
+    for val in to_delete:
+        tree.delete(val)
+        assert not tree.contains(val)
+        assert_valid_bplus(tree)
+    assert list(tree) == sorted(set(sequence) - set(to_delete))
+
+
+def test_bplus_large_random():
+    """B+ tree matches a set through a random insert/delete workload."""
+    tree, expected = BPlusTree(fanout=5), set()
+    for _ in range(3000):
+        val = random.randrange(500)
+        if random.random() < 0.55:
+            tree.insert(val)
+            expected.add(val)
+        else:
+            tree.delete(val)
+            expected.discard(val)
+    assert_valid_bplus(tree)
+    assert list(tree) == sorted(expected)
+    assert all(tree.contains(v) == (v in expected) for v in range(500))
+
+
+def test_bplus_search_and_errors():
+    """search returns the holding leaf, delete errors on request."""
+    tree = BPlusTree(range(100), fanout=4)
+    assert 42 in tree.search(42).keys
+    assert tree.search(100) is None
+    assert 99 in tree and 100 not in tree
+    assert tree.depth > 1
+    with pytest.raises(ValueError):
+        tree.delete(100, error=True)
+    with pytest.raises(ValueError):
+        BPlusTree(fanout=2)
+
+
+@pytest.mark.parametrize('lo, hi, inclusive', IRANGE_CASES)
+@pytest.mark.parametrize('reverse', [False, True])
+def test_bplus_irange(lo, hi, inclusive, reverse):
+    """B+ irange matches the AVL irange."""
+    values = TEST_BST1 + list(range(20, 60, 3))
+    avl = BinaryTree(values)
+    tree = BPlusTree(values, fanout=3)
+    assert (list(tree.irange(lo, hi, inclusive, reverse)) ==
+            list(avl.irange(lo, hi, inclusive, reverse)))
+
+
+@pytest.fixture(params=[None, 'q'])
+def frozen_pair(request):
+    """Return a tree and a frozen copy of it."""
+    tree = BinaryTree(TEST_BST2)
+    return tree, tree.freeze(typecode=request.param)
+
+
+def test_freeze_lookups(frozen_pair):
+    """Frozen tree answers membership, search and rank like the tree."""
+    tree, frozen = frozen_pair
+    assert len(frozen) == len(tree)
+    assert list(frozen) == list(tree.in_order())
+    for val in range(-1, 52):
+        assert frozen.contains(val) == tree.contains(val)
+        assert (val in frozen) == tree.contains(val)
+        assert frozen.rank(val) == tree.rank(val)
+        assert frozen.rank(val, True) == tree.rank(val, True)
+    assert frozen.keys[frozen.search(17)] == 17
+    assert frozen.search(18) is None
+    assert frozen[0] == 4 and frozen[-1] == 49
+
+
+@pytest.mark.parametrize('lo, hi, inclusive', IRANGE_CASES)
+@pytest.mark.parametrize('reverse', [False, True])
+def test_freeze_irange(lo, hi, inclusive, reverse):
+    """Frozen irange and count_between match the tree's."""
+    tree = BinaryTree(TEST_BST1)
+    frozen = tree.freeze()
+    assert (list(frozen.irange(lo, hi, inclusive, reverse)) ==
+            list(tree.irange(lo, hi, inclusive, reverse)))
+    if lo is not None and hi is not None:
+        assert (frozen.count_between(lo, hi, inclusive) ==
+                tree.count_between(lo, hi, inclusive))
+
+
+def test_frozen_thaw():
+    """Thawing a frozen tree gives back a balanced BinaryTree."""
+    frozen = FrozenTree([1, 2, 2, 5, 8])
+    tree = frozen.thaw()
+    assert_valid_avl(tree)
+    assert list(tree.in_order()) == [1, 2, 5, 8]
+
+
+def test_treemap_mapping_methods():
+    """TreeMap supports item access, get, pop and setdefault by key."""
+    tmap = TreeMap()
+    for i, key in enumerate(TEST_BST2):
+        tmap[key] = str(i)
+    tmap[8] = 'eight'
+    assert len(tmap) == len(TEST_BST2)
+    assert tmap[8] == 'eight'
+    assert tmap.get(6) == '1'
+    assert tmap.get(7) is None
+    assert tmap.get(7, 'x') == 'x'
+    with pytest.raises(KeyError):
+        tmap[7]
+    assert tmap.setdefault(7, 'seven') == 'seven'
+    assert tmap.setdefault(7, 'other') == 'seven'
+    assert tmap.pop(7) == 'seven'
+    assert tmap.pop(7, None) is None
+    with pytest.raises(KeyError):
+        tmap.pop(7)
+    del tmap[8]
+    assert 8 not in tmap
+    assert_valid_avl(tmap)
+
+
+def test_treemap_values_survive_rebalancing():
+    """Values stay attached to their keys through rotations and deletes."""
+    keys = random.sample(range(1000), 300)
+    tmap = TreeMap()
+    for key in keys:
+        tmap[key] = -key
+    for key in keys[:150]:
+        del tmap[key]
+    assert_valid_avl(tmap)
+    assert list(tmap.items()) == [(k, -k) for k in sorted(keys[150:])]
+
+
+def test_treemap_key_function():
+    """With a key function, records are stored under their computed keys."""
+    Record = namedtuple('Record', 'id name')
+    records = [Record(i, name) for i, name in enumerate('dcbae')]
+    tmap = TreeMap(records, key=lambda r: r.name)
+    assert list(tmap.keys()) == list('abcde')
+    assert tmap['b'] == records[2]
+    assert list(tmap.values('b', 'd', inclusive=(False, True))) == [
+        records[1], records[0]]
+    assert list(tmap.items('d', reverse=True)) == [
+        ('e', records[4]), ('d', records[0])]
+    left, found, right = tmap.split('c')
+    assert found and right.key is tmap.key
+    right.insert(Record(9, 'z'))
+    assert right['z'].id == 9
+
+
+def test_treemap_from_sorted():
+    """TreeMap.from_sorted links items with their values."""
+    items = [(3, 'c'), (1, 'a'), (2, 'b'), (1, 'x')]
+    tmap = TreeMap.from_sorted(items, presorted=False, key=lambda p: p[0])
+    assert_valid_avl(tmap)
+    assert list(tmap.items()) == [(1, (1, 'x')), (2, (2, 'b')), (3, (3, 'c'))]
+    assert list(tmap.items()) == list(TreeMap(items, key=lambda p: p[0]).items())
+    first = operator.itemgetter(0)
+    tmap = TreeMap.from_sorted([(1, 'a'), (1, 'b'), (2, 'c')], key=first)
+    assert list(tmap.values()) == [(1, 'b'), (2, 'c')]
+
+
+@pytest.mark.parametrize('bulk_ratio', [0, 10 ** 9])
+@pytest.mark.parametrize('persistent', [False, True])
+def test_update_and_delete_many(bulk_ratio, persistent):
+    """Both batch engines leave a valid tree with the right values."""
+    values = set(random.sample(range(2000), 300))
+    tree = BinaryTree(values, persistent=persistent)
+    tree.bulk_ratio = bulk_ratio
+    snap = tree.snapshot() if persistent else None
+    batch = [random.randrange(2000) for _ in range(400)]
+    tree.update(batch)
+    values.update(batch)
+    assert_valid_avl(tree, parents=not persistent)
+    assert list(tree.in_order()) == sorted(values)
+    doomed = random.sample(sorted(values), 200) + [5000]
+    tree.delete_many(doomed)
+    values.difference_update(doomed)
+    assert_valid_avl(tree, parents=not persistent)
+    assert list(tree.in_order()) == sorted(values)
+    if snap:
+        assert len(list(snap.in_order())) == len(snap) < 400
+
+
+def test_update_rebuild_on_empty_tree():
+    """A batch into an empty tree takes the rebuild path."""
+    tree = BinaryTree()
+    tree.update([5, 3, 5, 1])
+    assert_valid_avl(tree)
+    assert list(tree.in_order()) == [1, 3, 5]
+    tree.update([])
+    assert len(tree) == 3
+
+
+@pytest.mark.parametrize('bulk_ratio', [0, 10 ** 9])
+def test_treemap_update_keeps_values(bulk_ratio):
+    """Batch updates on a TreeMap replace values like insert does."""
+    tmap = TreeMap([(1, 'a'), (3, 'c')], key=lambda p: p[0])
+    tmap.bulk_ratio = bulk_ratio
+    tmap.update([(2, 'b'), (3, 'x'), (2, 'y')])
+    assert_valid_avl(tmap)
+    assert list(tmap.values()) == [(1, 'a'), (2, 'y'), (3, 'x')]
+    tmap.delete_many([1])
+    assert list(tmap.keys()) == [2, 3]
+
+
+@pytest.mark.parametrize('persistent', [False, True])
+def test_stats_hook_reports_each_operation(persistent):
+    """stats_hook gets an OpStats for every insert and delete."""
+    tree = BinaryTree(range(1, 8), persistent=persistent)
+    stats = []
+    hook = tree.stats_hook = stats.append
+    tree.insert(8)
+    tree.insert(9)
+    tree.delete(1)
+    tree.delete(100)
+    assert [(st.op, st.val) for st in stats] == [
+        ('insert', 8), ('insert', 9), ('delete', 1), ('delete', 100)]
+    assert stats[0].comparisons == 3
+    assert stats[1].rotations == 1
+    assert all(st.retraced <= tree.root.depth + 1 for st in stats)
+    assert stats[3].retraced == 0
+    assert tree.stats_hook is hook
+    assert_valid_avl(tree, parents=not persistent)
+
+
+def test_retrace_stops_early():
+    """Most updates only recompute depths of a few nodes near the leaf."""
+    tree = BinaryTree(range(1 << 12))
+    stats = []
+    tree.stats_hook = stats.append
+    for val in random.sample(range(1 << 12), 500):
+        tree.delete(val)
+        tree.insert(val)
+    assert_valid_avl(tree)
+    mean = sum(st.retraced for st in stats) / float(len(stats))
+    assert mean < tree.root.depth / 2.0
+
+
+def assert_valid_aggregates(tree):
+    """Check every node's cached aggregate against its subtree."""
+    func, measure = tree.agg_spec
+
+    def check(node):
+        if node is None:
+            return []
+        measures = check(node.left) + [measure(node)] + check(node.right)
+        expected = measures[0]
+        for item in measures[1:]:
+            expected = func(expected, item)
+        assert node.agg == expected
+        return measures
+
+    check(tree.root)
+
+
+AGG_CASES = [
+    ('sum', sum),
+    ('min', min),
+    ('max', max),
+    ('count', len),
+]
+
+
+@pytest.mark.parametrize('aggregate, brute', AGG_CASES)
+@pytest.mark.parametrize('persistent', [False, True])
+def test_aggregate_through_inserts_and_deletes(aggregate, brute, persistent):
+    """Cached aggregates survive inserts, deletes and rotations."""
+    tree = BinaryTree(aggregate=aggregate, persistent=persistent)
+    values = set()
+    for val in random.sample(range(400), 200):
+        tree.insert(val)
+        values.add(val)
+    for val in random.sample(range(400), 150):
+        tree.delete(val)
+        values.discard(val)
+    assert_valid_avl(tree, parents=not persistent)
+    assert_valid_aggregates(tree)
+    for lo, hi, inclusive in IRANGE_CASES:
+        lo = lo and lo * 30
+        hi = hi and hi * 30
+        in_range = [v for v in values
+                    if (lo is None or (lo <= v if inclusive[0] else lo < v))
+                    and (hi is None or (v <= hi if inclusive[1] else v < hi))]
+        expected = brute(in_range) if in_range else None
+        assert tree.aggregate(lo, hi, inclusive) == expected
+
+
+def test_aggregate_custom_function_and_measure():
+    """Any associative function works, combined in key order."""
+    tree = BinaryTree('dbeac', aggregate=operator.add, measure=lambda n: n.val)
+    assert tree.aggregate() == 'abcde'
+    assert tree.aggregate('b', 'd') == 'bcd'
+    assert tree.aggregate('b', 'd', inclusive=(False, False)) == 'c'
+    assert tree.aggregate('x', 'z', default='') == ''
+
+
+def test_aggregate_requires_spec():
+    """A tree built without aggregate cannot answer aggregate queries."""
+    with pytest.raises(TypeError):
+        BinaryTree([1, 2, 3]).aggregate()
+
+
+@pytest.mark.parametrize('bulk_ratio', [0, 10 ** 9])
+def test_aggregate_through_batches_and_from_sorted(bulk_ratio):
+    """Rebuilt and batch-updated trees carry correct aggregates."""
+    tree = BinaryTree.from_sorted(range(100), aggregate='sum')
+    assert tree.aggregate() == sum(range(100))
+    tree.bulk_ratio = bulk_ratio
+    tree.update(range(50, 150))
+    tree.delete_many(range(0, 150, 3))
+    assert_valid_aggregates(tree)
+    assert tree.aggregate(10, 120) == sum(v for v in range(10, 121) if v % 3)
+
+
+def test_aggregate_through_join_and_split():
+    """Trees from join and split keep the aggregate of their parent."""
+    left = BinaryTree(range(0, 40), aggregate='max')
+    right = BinaryTree(range(41, 300), aggregate='max')
+    tree = BinaryTree.join(left, 40, right)
+    assert_valid_aggregates(tree)
+    assert tree.aggregate(hi=99.5) == 99
+    low, _, high = tree.split(150)
+    assert_valid_aggregates(low)
+    assert_valid_aggregates(high)
+    assert low.aggregate() == 149
+    assert high.aggregate(hi=200) == 200
+
+
+def test_treemap_aggregates_values():
+    """TreeMap aggregates values by default, following reassignment."""
+    tmap = TreeMap(aggregate='sum')
+    for key in random.sample(range(100), 100):
+        tmap[key] = key * 2
+    tmap[10] = 1000
+    del tmap[20]
+    assert tmap.setdefault(20, 7) == 7
+    assert_valid_avl(tmap)
+    assert_valid_aggregates(tmap)
+    expected = sum(k * 2 for k in range(100)) - 20 + 1000 - 40 + 7
+    assert tmap.aggregate() == expected
+    assert tmap.aggregate(5, 15) == sum(k * 2 for k in range(5, 16)) + 980
+    built = TreeMap.from_sorted([(1, 5), (2, 6)], key=lambda p: p[0],
+                                aggregate='sum', measure=lambda n: n.value[1])
+    assert built.aggregate() == 11
+
+
+def random_intervals(num, span=1000):
+    """Return num random (start, end) intervals within span."""
+    intervals = []
+    for _ in range(num):
+        start = random.randrange(span)
+        intervals.append((start, start + random.randrange(60)))
+    return intervals
+
+
+@pytest.mark.parametrize('persistent', [False, True])
+def test_interval_tree_queries_match_brute_force(persistent):
+    """overlapping and stabbing find exactly the intersecting intervals."""
+    intervals = set(random_intervals(300))
+    tree = IntervalTree(intervals, persistent=persistent)
+    for interval in random.sample(sorted(intervals), 100):
+        tree.delete(interval)
+        intervals.discard(interval)
+    assert_valid_avl(tree, parents=not persistent)
+    assert_valid_aggregates(tree)
+    for _ in range(50):
+        lo = random.randrange(-20, 1100)
+        hi = lo + random.randrange(30)
+        assert list(tree.overlapping(lo, hi)) == sorted(
+            iv for iv in intervals if iv[0] <= hi and lo <= iv[1])
+        assert list(tree.stabbing(lo)) == sorted(
+            iv for iv in intervals if iv[0] <= lo <= iv[1])
+
+
+def test_interval_tree_from_sorted_and_payloads():
+    """Bulk build keeps max ends; extra tuple items ride along."""
+    intervals = sorted((s, e, 'r{}'.format(i))
+                       for i, (s, e) in enumerate(random_intervals(500)))
+    tree = IntervalTree.from_sorted(intervals)
+    assert_valid_avl(tree)
+    assert_valid_aggregates(tree)
+    assert list(tree.stabbing(500)) == [
+        iv for iv in intervals if iv[0] <= 500 <= iv[1]]
+    left, _, right = tree.split((500, 500))
+    assert isinstance(left, IntervalTree)
+    assert_valid_aggregates(left)
+    assert list(right.overlapping(0, 499)) == []
+
+
+def test_interval_tree_prunes_subtrees():
+    """Queries visit few nodes outside the answer."""
+    tree = IntervalTree.from_sorted((i, i + 1) for i in range(0, 20000, 2))
+    visited = []
+
+    class Spy(tuple):
+        def __getitem__(self, i):
+            visited.append(self)
+            return tuple.__getitem__(self, i)
+
+    for node in tree.in_order(attr=None):
+        node.val = Spy(node.val)
+    assert list(tree.overlapping(10001, 10003)) == [(10000, 10001),
+                                                    (10002, 10003)]
+    assert tree.root.agg == 19999
+    assert len(set(map(id, visited))) < 4 * tree.root.depth
+
+
+def test_interval_tree_rejects_reversed_interval():
+    """An interval ending before it starts raises ValueError."""
+    tree = IntervalTree([(1, 2)])
+    with pytest.raises(ValueError):
+        tree.insert((5, 3))
+    assert list(tree.in_order()) == [(1, 2)]
+
+
+def test_scapegoat_tree_stays_shallow():
+    """Scapegoat rebuilds bound depth without rotating."""
+    import math
+    tree = BinaryTree(balancer='scapegoat')
+    values = set()
+    for val in range(2000):
+        tree.insert(val)
+        values.add(val)
+    for val in random.sample(range(2000), 1500):
+        tree.delete(val)
+        values.discard(val)
+    for val in random.sample(range(2000, 4000), 500):
+        tree.insert(val)
+        values.add(val)
+    assert tree.rotations == 0
+    assert tree.rebuilds > 0
+    assert list(tree.in_order()) == sorted(values)
+    bound = math.log(len(tree), 1 / tree.scapegoat_alpha) + 2
+    assert tree.root.depth <= bound
+
+    def check(node, parent):
+        if node is None:
+            return 0, 0
+        assert node.parent is parent
+        ldepth, lsize = check(node.left, node)
+        rdepth, rsize = check(node.right, node)
+        assert node.depth == 1 + max(ldepth, rdepth)
+        assert node.size == 1 + lsize + rsize
+        return node.depth, node.size
+
+    check(tree.root, None)
+    assert tree[10] == sorted(values)[10]
+
+
+def test_scapegoat_keeps_features():
+    """Aggregates, maps and split work on scapegoat trees."""
+    tree = BinaryTree(range(0, 300, 3), aggregate='sum', balancer='scapegoat')
+    for val in range(300):
+        tree.insert(val)
+    tree.delete_many(range(0, 300, 2))
+    assert_valid_aggregates(tree)
+    assert tree.aggregate(10, 20) == sum(range(11, 21, 2))
+    left, _, right = tree.split(150)
+    assert right.balancer == 'scapegoat'
+    tmap = TreeMap(balancer='scapegoat')
+    for key in range(100):
+        tmap[key] = str(key)
+    assert tmap[42] == '42'
+
+
+def test_balancer_argument_checked():
+    """Unknown balancers and persistent scapegoat trees are refused."""
+    with pytest.raises(ValueError):
+        BinaryTree(balancer='splay')
+    with pytest.raises(ValueError):
+        BinaryTree(persistent=True, balancer='scapegoat')
+
+
+@pytest.mark.parametrize('balancer', ['avl', 'scapegoat'])
+def test_finger_search_agrees_with_root_search(balancer):
+    """Finger mode finds the same nodes through inserts and deletes."""
+    tree = BinaryTree(finger=True, balancer=balancer)
+    plain = BinaryTree()
+    for _ in range(3000):
+        val = random.randrange(500)
+        op = random.random()
+        if op < 0.4:
+            tree.insert(val)
+            plain.insert(val)
+        elif op < 0.7:
+            tree.delete(val)
+            plain.delete(val)
+        else:
+            found = tree.search(val)
+            assert (found and found.val) == (plain.search(val) and val)
+    assert list(tree.in_order()) == list(plain.in_order())
+    if balancer == 'avl':
+        assert_valid_avl(tree)
+
+
+def test_finger_search_is_local():
+    """Nearby lookups compare against few nodes once the finger is set."""
+    tree = BinaryTree(range(1 << 14), finger=True)
+    compared = []
+
+    class Spy(object):
+        def __init__(self, val):
+            self.val = val
+
+        def __eq__(self, other):
+            compared.append(other)
+            return self.val == other
+
+        def __lt__(self, other):
+            return self.val < other
+
+        def __gt__(self, other):
+            return self.val > other
+
+    tree.search(5000)
+    for val in range(5001, 5101):
+        assert tree.search(Spy(val)).val == val
+    assert len(compared) < 100 * 6
+    del compared[:]
+    tree.insert(Spy(5100.5))
+    assert len(compared) < 12
+    assert tree.contains(5100.5)
+
+
+def test_finger_reset_when_nodes_leave_tree():
+    """Finger never points into another tree after split or union."""
+    tree = BinaryTree(range(100), finger=True)
+    tree.search(70)
+    left, _, right = tree.split(50)
+    assert right.finger and left.search(70) is None
+    assert right.search(70).val == 70
+    right.union(BinaryTree(range(200, 210)))
+    assert right.search(205).val == 205
+    with pytest.raises(ValueError):
+        BinaryTree(persistent=True, finger=True)
+
+
+@pytest.mark.parametrize('typecode', [None, 'q'])
+@pytest.mark.parametrize('sequence', TEST_INSERTIONS[:12])
+def test_dump_load_round_trip(sequence, typecode):
+    """load rebuilds the exact dumped shape, depths and sizes."""
+    import io
+    tree = BinaryTree(sequence)
+    stream = io.BytesIO()
+    tree.dump(stream, typecode=typecode)
+    stream.seek(0)
+    loaded = BinaryTree.load(stream)
+    assert_valid_avl(loaded)
+    assert list(loaded.pre_order()) == list(tree.pre_order())
+    assert loaded.rotations == 0
+
+
+def test_dump_load_degenerate_tree_and_options():
+    """Deep trees round trip without recursion; kwargs configure the tree."""
+    import io
+    import sys
+    tree = BinaryTree(autobalance=False)
+    tree.root = node = BinaryTreeNode(0)
+    depth = sys.getrecursionlimit() + 10
+    for val in range(1, depth):
+        node.left = BinaryTreeNode(-val, parent=node)
+        node = node.left
+    tree._size = depth
+    stream = io.BytesIO()
+    tree.dump(stream, typecode='d')
+    stream.seek(0)
+    loaded = BinaryTree.load(stream, autobalance=False, aggregate='min')
+    assert loaded.root.depth == depth and len(loaded) == depth
+    assert loaded.aggregate() == 1 - depth
+    assert list(loaded.pre_order()) == [float(-v) for v in range(depth)]
+    stream = io.BytesIO()
+    BinaryTree(range(100)).dump(stream)
+    stream.seek(0)
+    persistent = BinaryTree.load(stream, persistent=True)
+    snap = persistent.snapshot()
+    persistent.insert(0.5)
+    assert_valid_avl(persistent, parents=False)
+    assert 0.5 in persistent and 0.5 not in snap
+
+
+def test_dump_keys_can_be_mapped_in_place():
+    """Numeric keys sit in the stream as an aligned raw array."""
+    import io
+    from data_structures.bst import DUMP_HEADER
+    tree = BinaryTree(range(1, 8))
+    stream = io.BytesIO()
+    tree.dump(stream, typecode='q')
+    start = DUMP_HEADER.size + len(tree)
+    start += -start % 8
+    keys = memoryview(stream.getvalue())[start:start + 8 * 7].cast('q')
+    assert list(keys) == list(tree.pre_order())
+
+
+def test_dump_load_treemap_values():
+    """TreeMap dumps carry each key's value."""
+    import io
+    tmap = TreeMap([(i, str(i)) for i in range(50)], key=lambda p: p[0])
+    stream = io.BytesIO()
+    tmap.dump(stream, typecode='i')
+    stream.seek(0)
+    loaded = TreeMap.load(stream, aggregate='count')
+    assert list(loaded.items()) == list(tmap.items())
+    assert loaded.aggregate(10, 19) == 10
+
+
+def test_load_rejects_bad_streams():
+    """Garbage and truncated dumps raise ValueError."""
+    import io
+    with pytest.raises(ValueError):
+        BinaryTree.load(io.BytesIO(b'not a tree dump at all'))
+    stream = io.BytesIO()
+    BinaryTree(range(10)).dump(stream, typecode='q')
+    with pytest.raises(ValueError):
+        BinaryTree.load(io.BytesIO(stream.getvalue()[:-8]))
+
+
+def test_stats_hook_counts_finger_comparisons():
+    """With a finger, comparisons count the climb and descent actually made."""
+    tree = BinaryTree(range(1, 1 << 10), finger=True)
+    stats = []
+    tree.search(500)
+    tree.stats_hook = stats.append
+    tree.delete(501)
+    tree.insert(501)
+    assert [st.op for st in stats] == ['delete', 'insert']
+    assert all(0 < st.comparisons < tree.root.depth for st in stats)
+    tree.search(1)
+    tree.insert(2)
+    assert stats[-1].comparisons < 4
+
+
+def test_stats_hook_reports_treemap_writes():
+    """TreeMap inserts, item assignments and setdefault report by key."""
+    tmap = TreeMap([(k, str(k)) for k in range(1, 8)], key=lambda p: p[0])
+    stats = []
+    tmap.stats_hook = stats.append
+    assert tmap.insert((8, 'h')) is None
+    tmap[9] = (9, 'i')
+    assert tmap.setdefault(4) == (4, '4')
+    assert tmap.setdefault(10, (10, 'j')) == (10, 'j')
+    del tmap[1]
+    assert [(st.op, st.val) for st in stats] == [
+        ('insert', 8), ('insert', 9), ('insert', 4), ('insert', 10),
+        ('delete', 1)]
+    assert stats[0].comparisons == 3
+    assert stats[2].comparisons == 1
+    assert tmap[10] == (10, 'j')
@@ -0,0 +1,126 @@
+"""Tests for the reader-writer locked binary search tree."""
+
+import random
+import threading
+
+import pytest
+
+from data_structures.concurrent_bst import ConcurrentBinaryTree, RWLock
+
+
+def test_reads_and_writes():
+    """Wrapper answers like a BinaryTree."""
+    tree = ConcurrentBinaryTree([5, 1, 9, 3])
+    tree.insert(7)
+    tree.delete(1)
+    assert list(tree) == [3, 5, 7, 9]
+    assert len(tree) == 4
+    assert 7 in tree and 1 not in tree
+    assert tree.floor(6) == 5 and tree.ceiling(6) == 7
+    assert tree.floor(0) is None
+    assert tree.rank(7) == 2 and tree[2] == 7
+    assert tree.count_between(4, 9) == 3
+    assert list(tree.irange(4, 8, reverse=True)) == [7, 5]
+    with pytest.raises(ValueError):
+        tree.delete(100, error=True)
+
+
+def test_iteration_sees_snapshot():
+    """Writes during iteration don't show up in or break the iterator."""
+    tree = ConcurrentBinaryTree(range(100))
+    values = iter(tree)
+    first = [next(values) for _ in range(10)]
+    tree.delete_many(range(50))
+    tree.update(range(100, 200))
+    assert first + list(values) == list(range(100))
+    assert list(tree) == list(range(50, 200))
+    assert tree.snapshot() is tree.snapshot()
+
+
+def test_batch_is_atomic():
+    """Readers see all or none of a batch's writes."""
+    tree = ConcurrentBinaryTree(range(10))
+    before = tree.snapshot()
+    seen = []
+    with tree.batch() as raw:
+        raw.insert(10)
+        reader = threading.Thread(target=lambda: seen.append(len(tree)))
+        reader.start()
+        raw.delete(0)
+        raw.insert(11)
+        assert seen == []
+    reader.join()
+    assert seen == [11]
+    assert list(before.in_order()) == list(range(10))
+
+
+def test_rwlock_shares_reads_and_excludes_writes():
+    """Readers overlap each other but never a writer."""
+    lock = RWLock()
+    lock.acquire_read()
+    lock.acquire_read()
+    entered = threading.Event()
+
+    def write():
+        with lock.writing():
+            entered.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    assert not entered.wait(0.05)
+    lock.release_read()
+    assert not entered.wait(0.05)
+    lock.release_read()
+    writer.join(5)
+    assert entered.is_set()
+
+
+def test_threads_keep_tree_consistent():
+    """Concurrent readers only ever see a complete, sorted tree."""
+    tree = ConcurrentBinaryTree(range(0, 2000, 2))
+    errors = []
+
+    def reader():
+        for _ in range(20):
+            values = list(tree)
+            if values != sorted(set(values)):
+                errors.append(values)
+            tree.contains(random.randrange(2000))
+
+    def writer():
+        for _ in range(300):
+            val = random.randrange(2000)
+            tree.insert(val)
+            tree.delete(random.randrange(2000))
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    snap = tree.snapshot()
+    assert len(list(snap.in_order())) == len(tree)
+
+
+def test_concurrent_snapshots_are_shared():
+    """Readers asking for a snapshot at once all get the same one."""
+    tree = ConcurrentBinaryTree(range(100))
+    barrier = threading.Barrier(8)
+    snaps = []
+
+    def reader():
+        barrier.wait()
+        snaps.append(tree.snapshot())
+
+    threads = [threading.Thread(target=reader) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(snaps) == 8
+    assert all(snap is snaps[0] for snap in snaps)
+    tree.insert(100)
+    assert tree.snapshot() is not snaps[0]
+    assert list(snaps[0].in_order()) == list(range(100))
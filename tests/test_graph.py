@@ -244,17 +244,17 @@ def test_add_edge_depth(complex_g):
 
 def test_shortest_dijkstra(complex_g):
     """Test dijkstra returns shortest path."""
-    assert complex_g.dijkstra('A', 'F') == ['F', 'C', 'A']
+    assert complex_g.dijkstra('A', 'F') == (14, ['A', 'C', 'F'])
 
 
 def test_shortest_dijkstra_long(complex_g):
     """Test dijkstra returns shortest path."""
-    assert complex_g.dijkstra('A', 'X') == ['X', 'D', 'B', 'A']
+    assert complex_g.dijkstra('A', 'X') == (17, ['A', 'B', 'D', 'X'])
 
 
 def test_loop_dijkstra(complex_g):
     """Test dijkstra returns shortest path."""
-    assert complex_g.dijkstra('A', 'Z') == ['Z', 'E', 'B', 'A']
+    assert complex_g.dijkstra('A', 'Z') == (16, ['A', 'B', 'E', 'Z'])
 
 
 def test_floyd_warshall_no_path(complex_g):
@@ -281,5 +281,369 @@ def test_alternative_routes(complex_g):
     path, distances = complex_g.floyd_warshall()
     assert complex_g.floyd_warshall_path(path, 'A', 'B') == ['A', 'C', 'B']
     assert complex_g.floyd_warshall_path(path, 'A', 'X') == ['A', 'C', 'B', 'D', 'X']
-    assert complex_g.dijkstra('A', 'B') == ['B', 'C', 'A']
-    assert complex_g.dijkstra('A', 'X') == ['X', 'D', 'B', 'C', 'A']
\ No newline at end of file
+    assert complex_g.dijkstra('A', 'B') == (7, ['A', 'C', 'B'])
+    assert complex_g.dijkstra('A', 'X') == (14, ['A', 'C', 'B', 'D', 'X'])
+
+
+def test_shortest_paths_all_reachable(complex_g):
+    """shortest_paths returns distances and predecessors of every node."""
+    distance, predecessor = complex_g.shortest_paths('A')
+    assert distance == {'A': 0, 'B': 10, 'C': 6, 'D': 13, 'E': 15, 'F': 14,
+                        'G': 13, 'X': 17, 'Y': 22, 'Z': 16}
+    assert predecessor['A'] is None
+    assert complex_g.dijkstra_path(predecessor, 'Z') == ['A', 'B', 'E', 'Z']
+    assert complex_g.dijkstra_path(predecessor, 'nowhere') == []
+
+
+def test_shortest_paths_stops_at_end(complex_g):
+    """With an end, nodes farther than end are not settled."""
+    distance, predecessor = complex_g.shortest_paths('A', 'C')
+    assert distance == {'A': 0, 'C': 6}
+
+
+def test_dijkstra_distance_and_path(complex_g):
+    """dijkstra returns distance and path, or None and [] if unreachable."""
+    assert complex_g.dijkstra('A', 'X') == (17, ['A', 'B', 'D', 'X'])
+    assert complex_g.dijkstra('A', 'A') == (0, ['A'])
+    assert complex_g.dijkstra('Z', 'A') == (None, [])
+    with pytest.raises(KeyError):
+        complex_g.dijkstra('nowhere', 'A')
+
+
+def test_dijkstra_matches_floyd_warshall():
+    """Dijkstra distances agree with floyd_warshall on random graphs."""
+    import random
+    graph = Graph()
+    for _ in range(200):
+        n1, n2 = random.sample(range(30), 2)
+        if not graph.has_node(n1) or n2 not in graph.neighbors(n1):
+            graph.add_edge(n1, n2, random.randint(0, 20))
+    path_dict, distances = graph.floyd_warshall()
+    for start in graph.nodes():
+        distance, _ = graph.shortest_paths(start)
+        assert distance == {node: dist for node, dist
+                            in distances[start].items() if dist != float('inf')}
+
+
+def test_floyd_warshall_self_loop():
+    """A positive self loop doesn't make a node further from itself."""
+    graph = Graph.from_dict({'A': {'A': 5, 'B': 1}, 'B': {'A': 2}})
+    path, distances = graph.floyd_warshall()
+    assert distances['A'] == {'A': 0, 'B': 1}
+    assert graph.floyd_warshall_path(path, 'B', 'A') == ['B', 'A']
+
+
+def test_floyd_warshall_matrix(complex_g):
+    """Matrix floyd warshall finds the same paths as the dict version."""
+    pytest.importorskip('numpy')
+    nodes, distance, next_hop = complex_g.floyd_warshall_matrix()
+    assert distance[nodes.index('A'), nodes.index('X')] == 17
+    assert distance[nodes.index('Z'), nodes.index('A')] == float('inf')
+    assert complex_g.floyd_warshall_matrix_path(
+        nodes, next_hop, 'A', 'Z') == ['A', 'B', 'E', 'Z']
+    assert complex_g.floyd_warshall_matrix_path(
+        nodes, next_hop, 'Z', 'A') == []
+
+
+def test_floyd_warshall_matrix_matches_dicts():
+    """Matrix and dict floyd warshall agree on random graphs."""
+    pytest.importorskip('numpy')
+    import random
+    graph = Graph()
+    for _ in range(300):
+        n1, n2 = random.randrange(40), random.randrange(40)
+        if not graph.has_node(n1) or n2 not in graph.neighbors(n1):
+            graph.add_edge(n1, n2, random.randint(0, 20))
+    _, distances = graph.floyd_warshall()
+    nodes, distance, next_hop = graph.floyd_warshall_matrix()
+    for i, start in enumerate(nodes):
+        for j, end in enumerate(nodes):
+            assert distance[i, j] == distances[start][end]
+            path = graph.floyd_warshall_matrix_path(nodes, next_hop, start, end)
+            assert sum(graph.weight(a, b) for a, b in zip(path, path[1:])) == \
+                (distance[i, j] if path else 0)
+
+
+def test_freeze_layout(complex_g):
+    """CSRGraph packs each node's edges into consecutive slots."""
+    csr = complex_g.freeze()
+    assert len(csr) == len(complex_g.nodes())
+    assert [csr.labels[i] for i in range(len(csr))] == complex_g.nodes()
+    a, b = csr.ids['A'], csr.ids['B']
+    assert sorted(csr.labels[i] for i in csr.neighbors(a)) == ['B', 'C']
+    assert dict(csr.edges_from(b)) == {csr.ids['D']: 3, csr.ids['E']: 5}
+    assert csr.out_degree(a) == 2 and csr.in_degree(a) == 0
+    assert csr.in_degree(b) == 2
+    assert csr.indptr[-1] == len(csr.indices) == len(csr.weights) == 10
+    assert csr.thaw().node_dict == complex_g.node_dict
+    with pytest.raises(KeyError):
+        csr.neighbors(len(csr))
+
+
+def test_freeze_traversals(complex_g):
+    """CSRGraph traversals visit the same nodes in the same order."""
+    csr = complex_g.freeze()
+    start = csr.ids['A']
+    labels = csr.labels.__getitem__
+    assert list(map(labels, csr.breadth_first(start))) == \
+        complex_g.breadth_first_traversal('A')
+    assert list(map(labels, csr.depth_first(start))) == \
+        complex_g.depth_first_traversal_iterative('A')
+
+
+def test_freeze_dijkstra(complex_g):
+    """CSRGraph dijkstra returns distance and path of ids."""
+    csr = complex_g.freeze(typecode='q')
+    ids = csr.ids
+    distance, path = csr.dijkstra(ids['A'], ids['X'])
+    assert distance == 17
+    assert [csr.labels[i] for i in path] == ['A', 'B', 'D', 'X']
+    assert csr.dijkstra(ids['Z'], ids['A']) == (None, [])
+    assert csr.dijkstra(ids['A'], ids['A']) == (0, [ids['A']])
+
+
+def test_freeze_unreachable_and_early_stop(complex_g):
+    """CSRGraph paths to unreached nodes are empty, like Graph's."""
+    csr = complex_g.freeze()
+    ids = csr.ids
+    distance, predecessor = csr.shortest_paths(ids['Z'])
+    assert csr.dijkstra_path(predecessor, ids['A']) == []
+    assert csr.dijkstra_path(predecessor, ids['Z']) == [ids['Z']]
+    distance, predecessor = csr.shortest_paths(ids['A'], ids['C'])
+    assert {csr.labels[i]: d for i, d in enumerate(distance)
+            if d != float('inf')} == {'A': 0, 'C': 6}
+    assert csr.dijkstra_path(predecessor, ids['B']) == []
+    with pytest.raises(KeyError):
+        csr.shortest_paths(ids['A'], len(csr))
+    with pytest.raises(KeyError):
+        csr.dijkstra(ids['A'], -1)
+
+
+def test_freeze_matches_graph():
+    """CSRGraph shortest paths agree with Graph on random graphs."""
+    import random
+    graph = Graph()
+    for _ in range(300):
+        n1, n2 = random.randrange(50), random.randrange(50)
+        if not graph.has_node(n1) or n2 not in graph.neighbors(n1):
+            graph.add_edge(n1, n2, random.randint(0, 20))
+    csr = graph.freeze()
+    for start in graph.nodes():
+        expected, _ = graph.shortest_paths(start)
+        distance, predecessor = csr.shortest_paths(csr.ids[start])
+        assert {csr.labels[i]: d for i, d in enumerate(distance)
+                if d != float('inf')} == expected
+        for end in expected:
+            path = csr.dijkstra_path(predecessor, csr.ids[end])
+            assert sum(graph.weight(csr.labels[i], csr.labels[j])
+                       for i, j in zip(path, path[1:])) == expected[end]
+
+
+@pytest.fixture(params=[False, True], ids=['scan', 'reverse_index'])
+def indexed_g(request):
+    """Return graph with self loop and cycle, with or without reverse index."""
+    return Graph.from_dict({
+        'a': {'b': 1, 'c': 2},
+        'b': {'c': 3, 'b': 4},
+        'c': {'a': 5},
+        'd': {'b': 6},
+    }, reverse_index=request.param)
+
+
+def test_predecessors(indexed_g):
+    """Predecessors and in_degree count edges into a node."""
+    assert sorted(indexed_g.predecessors('b')) == ['a', 'b', 'd']
+    assert indexed_g.in_degree('b') == 3
+    assert indexed_g.predecessors('d') == []
+    assert indexed_g.in_degree('d') == 0
+    with pytest.raises(KeyError):
+        indexed_g.predecessors('nowhere')
+    with pytest.raises(KeyError):
+        indexed_g.in_degree('nowhere')
+
+
+def test_del_node_with_reverse_index(indexed_g):
+    """del_node drops edges into and out of the node, self loops included."""
+    indexed_g.del_node('b')
+    assert indexed_g.node_dict == {'a': {'c': 2}, 'c': {'a': 5}, 'd': {}}
+    assert indexed_g.predecessors('c') == ['a']
+    indexed_g.del_edge('a', 'c')
+    assert indexed_g.in_degree('c') == 0
+    indexed_g.add_edge('d', 'c', 7)
+    assert indexed_g.predecessors('c') == ['d']
+    with pytest.raises(KeyError):
+        indexed_g.del_node('b')
+
+
+def test_reverse_index_stays_in_sync():
+    """in_dict mirrors node_dict through random edits."""
+    import random
+    graph = Graph(reverse_index=True)
+    for _ in range(500):
+        n1, n2 = random.randrange(30), random.randrange(30)
+        if random.random() < 0.1 and graph.has_node(n1):
+            graph.del_node(n1)
+        elif graph.has_node(n1) and n2 in graph.neighbors(n1):
+            graph.del_edge(n1, n2)
+        else:
+            graph.add_edge(n1, n2, random.randint(0, 9))
+    expected = {node: {} for node in graph.nodes()}
+    for n1, n2, weight in graph.edges():
+        expected[n2][n1] = weight
+    assert graph.in_dict == expected
+    assert graph.freeze().thaw(reverse_index=True).in_dict == expected
+
+
+def test_iter_depth_first(complex_g):
+    """Depth first generator streams nodes and honours its limits."""
+    assert list(complex_g.iter_depth_first('A')) == list('ABDXYEZCFG')
+    assert list(complex_g.iter_depth_first('A', max_depth=2)) == list('ABDECFG')
+    assert list(complex_g.iter_depth_first('A', max_depth=0)) == ['A']
+    assert list(complex_g.iter_depth_first(
+        'A', predicate=lambda node: node == 'E')) == list('ABDXYE')
+    assert list(complex_g.iter_depth_first(
+        'A', edge_filter=lambda n1, n2, w: w != 9)) == list('ABDXEZCFG')
+    with pytest.raises(KeyError):
+        complex_g.iter_depth_first('nowhere')
+
+
+def test_iter_depth_first_revisits_shallower(graph):
+    """A node first reached at the depth limit is explored once reached closer."""
+    for n1, n2 in ['AB', 'AC', 'BC', 'CD']:
+        graph.add_edge(n1, n2)
+    assert list(graph.iter_depth_first('A', max_depth=2)) == list('ABCD')
+    assert list(graph.iter_depth_first('A', max_depth=1)) == list('ABC')
+
+
+def test_iter_depth_first_max_depth_matches_breadth_first():
+    """Depth and breadth first find the same nodes within max_depth."""
+    import random
+    graph = Graph()
+    for _ in range(120):
+        n1, n2 = random.randrange(60), random.randrange(60)
+        if not graph.has_node(n1) or n2 not in graph.neighbors(n1):
+            graph.add_edge(n1, n2)
+    for start in graph.nodes():
+        for max_depth in range(4):
+            depth_first = list(graph.iter_depth_first(start, max_depth))
+            assert len(depth_first) == len(set(depth_first))
+            assert set(depth_first) == set(
+                graph.iter_breadth_first(start, max_depth))
+
+
+def test_iter_breadth_first(complex_g):
+    """Breadth first generator streams nodes and honours its limits."""
+    assert list(complex_g.iter_breadth_first('A')) == list('ABCDEFGXYZ')
+    assert list(complex_g.iter_breadth_first('A', max_depth=1)) == list('ABC')
+    assert list(complex_g.iter_breadth_first(
+        'A', predicate=lambda node: node == 'E')) == list('ABCDE')
+    assert list(complex_g.iter_breadth_first(
+        'A', edge_filter=lambda n1, n2, w: n2 != 'B')) == list('ACFG')
+    with pytest.raises(KeyError):
+        complex_g.iter_breadth_first('nowhere')
+
+
+def test_traversal_stops_early(complex_g):
+    """Generators only look at edges of nodes they have got to."""
+    touched = []
+    nodes = complex_g.iter_breadth_first(
+        'A', edge_filter=lambda n1, n2, w: touched.append(n1) or True)
+    assert next(nodes) == 'A'
+    assert next(nodes) == 'B'
+    assert set(touched) == {'A'}
+    assert complex_g.has_path('A', 'Z')
+    assert not complex_g.has_path('Z', 'A')
+    with pytest.raises(KeyError):
+        complex_g.has_path('A', 'nowhere')
+
+
+def test_depth_first_long_path(graph):
+    """Depth first traversal of a long path doesn't hit the recursion limit."""
+    import sys
+    length = sys.getrecursionlimit() + 100
+    for node in range(length):
+        graph.add_edge(node, node + 1)
+    assert graph.depth_first_traversal(0) == list(range(length + 1))
+
+
+@pytest.fixture
+def grid():
+    """Return 15x15 grid graph of (x, y) nodes with random weights >= 1."""
+    import random
+    graph = Graph()
+    for x in range(15):
+        for y in range(15):
+            graph.add_node((x, y))
+            for nx, ny in ((x + 1, y), (x, y + 1), (x - 1, y), (x, y - 1)):
+                if 0 <= nx < 15 and 0 <= ny < 15:
+                    graph.add_edge((x, y), (nx, ny), random.randint(1, 9))
+    return graph
+
+
+def manhattan(node, end):
+    """Return grid distance between nodes, never more than the path's."""
+    return abs(node[0] - end[0]) + abs(node[1] - end[1])
+
+
+def path_weight(graph, path):
+    """Return total weight of edges along path."""
+    return sum(graph.weight(n1, n2) for n1, n2 in zip(path, path[1:]))
+
+
+def test_astar(complex_g):
+    """astar returns distance and path, or None and [] if unreachable."""
+    assert complex_g.astar('A', 'X') == (17, ['A', 'B', 'D', 'X'])
+    assert complex_g.astar('A', 'X', lambda node, end: 1) == \
+        (17, ['A', 'B', 'D', 'X'])
+    assert complex_g.astar('A', 'A') == (0, ['A'])
+    assert complex_g.astar('Z', 'A') == (None, [])
+    with pytest.raises(KeyError):
+        complex_g.astar('A', 'nowhere')
+
+
+@pytest.mark.parametrize('reverse_index', [False, True])
+def test_bidirectional_dijkstra(complex_g, reverse_index):
+    """bidirectional_dijkstra returns distance and path like dijkstra."""
+    graph = complex_g.freeze(typecode='q').thaw(reverse_index=reverse_index)
+    assert graph.bidirectional_dijkstra('A', 'X') == (17, ['A', 'B', 'D', 'X'])
+    assert graph.bidirectional_dijkstra('A', 'Z') == (16, ['A', 'B', 'E', 'Z'])
+    assert graph.bidirectional_dijkstra('A', 'A') == (0, ['A'])
+    assert graph.bidirectional_dijkstra('Z', 'A') == (None, [])
+    with pytest.raises(KeyError):
+        graph.bidirectional_dijkstra('nowhere', 'A')
+
+
+def test_point_to_point_match_dijkstra(grid):
+    """astar and bidirectional_dijkstra find paths as short as dijkstra's."""
+    import random
+    for _ in range(30):
+        start, end = random.sample(grid.nodes(), 2)
+        distance, _ = grid.dijkstra(start, end)
+        for found, path in [grid.astar(start, end, manhattan),
+                            grid.bidirectional_dijkstra(start, end)]:
+            assert found == distance == path_weight(grid, path)
+            assert path[0] == start and path[-1] == end
+
+
+def test_point_to_point_settle_fewer(grid):
+    """astar and bidirectional_dijkstra settle fewer nodes than dijkstra."""
+    start, end = (0, 0), (14, 14)
+    settled = len(grid.shortest_paths(start, end)[0])
+    assert grid._astar(start, end, manhattan)[2] <= settled
+    assert grid._bidirectional_dijkstra(start, end)[2] <= settled + 1
+
+
+def test_bidirectional_dijkstra_random():
+    """bidirectional_dijkstra agrees with dijkstra on random graphs."""
+    import random
+    graph = Graph()
+    for _ in range(150):
+        n1, n2 = random.randrange(40), random.randrange(40)
+        if not graph.has_node(n1) or n2 not in graph.neighbors(n1):
+            graph.add_edge(n1, n2, random.randint(0, 20))
+    for start in graph.nodes():
+        for end in graph.nodes():
+            distance, path = graph.bidirectional_dijkstra(start, end)
+            assert distance == graph.dijkstra(start, end)[0]
+            if path:
+                assert path_weight(graph, path) == distance